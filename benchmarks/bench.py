@@ -0,0 +1,218 @@
+"""
+=============================================================================
+BENCHMARK - HOT PATH HUẤN LUYỆN VÀ DỰ ĐOÁN
+=============================================================================
+Nhân bản data/customer_churn.csv lên 10k / 100k / 1M dòng (lấy mẫu có hoàn lại)
+và đo:
+    - load_data + preprocess
+    - thời gian fit / predict từng mô hình trong train_and_evaluate
+    - throughput dự đoán hàng loạt (predict_batch)
+    - độ trễ dự đoán đơn lẻ (predict_single) p50 / p95 / p99
+    - bộ nhớ đỉnh của từng bước (tracemalloc)
+Mỗi kích thước chạy --repeat lần, mỗi chỉ số lấy median. Kết quả ghi ra JSON; --compare
+so với lần chạy trước và báo các chỉ số tệ đi quá --tolerance (tỉ lệ), bỏ qua chênh lệch
+tuyệt đối nhỏ hơn --min-delta-ms (số đo ~1 ms dao động nhiều hơn 20%).
+
+    python benchmarks/bench.py --sizes 10000,100000 --output bench.json
+    python benchmarks/bench.py --sizes 10000 --compare bench.json --tolerance 0.2 --repeat 5
+=============================================================================
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from src.preprocessing import load_data, preprocess
+from src.modeling import train_and_evaluate, save_model
+from src.predict import load_model, predict_batch, predict_single
+
+DATA_PATH = os.path.join(parent_dir, "data", "customer_churn.csv")
+
+# Chỉ số "càng lớn càng tốt"; còn lại (thời gian, bộ nhớ) là "càng nhỏ càng tốt"
+HIGHER_IS_BETTER = ("rows_per_s",)
+
+# Chênh lệch tuyệt đối tối thiểu để tính là regression, theo đơn vị của chỉ số (ms)
+def _min_delta(key, min_delta_ms):
+    if key == "seconds":
+        return min_delta_ms / 1000
+    if key.endswith("_ms"):
+        return min_delta_ms
+    if key == "peak_mb":
+        return 1.0
+    return 0.0
+
+def make_dataset(n_rows, seed=42):
+    """Tạo bộ dữ liệu n_rows dòng bằng cách lấy mẫu có hoàn lại từ dữ liệu gốc"""
+    base = load_data(DATA_PATH)
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    df["customerID"] = [f"SYN-{i:07d}" for i in range(n_rows)]
+    return df
+
+def measure(func, *args, memory=True, **kwargs):
+    """
+    Chạy func, trả về (kết quả, giây, bộ nhớ đỉnh MB).
+    Thời gian đo ở lần chạy không bật tracemalloc; bộ nhớ đỉnh đo ở lần chạy thứ hai
+    (tracemalloc làm chậm đáng kể nên không đo chung). memory=False bỏ qua lần thứ hai.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    if not memory:
+        return result, elapsed, None
+
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+def bench_size(n_rows, n_single=1000, workdir=None):
+    """Benchmark toàn bộ pipeline với n_rows dòng"""
+    workdir = workdir or tempfile.mkdtemp(prefix="churn_bench_")
+    csv_path = os.path.join(workdir, f"churn_{n_rows}.csv")
+    artifacts = workdir + os.sep
+    make_dataset(n_rows).to_csv(csv_path, index=False)
+
+    out = {}
+
+    # 1. Load + preprocess
+    df, t, mem = measure(load_data, csv_path)
+    out["load_data"] = {"seconds": t, "peak_mb": mem}
+    (X_train, X_test, y_train, y_test, _), t, mem = measure(preprocess, df, save_artifacts_path=artifacts)
+    out["preprocess"] = {"seconds": t, "peak_mb": mem}
+
+    # 2. Fit / predict từng mô hình
+    (best_model, results), t, _ = measure(train_and_evaluate, X_train, y_train, X_test, y_test,
+                                          memory=False)
+    out["train_and_evaluate"] = {"seconds": t}
+    for name, res in results.items():
+        out[f"fit[{name}]"] = {"seconds": res["fit_time"]}
+        out[f"predict[{name}]"] = {"seconds": res["predict_time"]}
+
+    model_path = os.path.join(workdir, "model.pkl")
+    save_model(best_model, model_path)
+    model = load_model(model_path)
+    preprocessor_path = os.path.join(workdir, "preprocessor.pkl")
+
+    # 3. Dự đoán hàng loạt từ dữ liệu thô
+    raw = df.drop(columns=["Churn"])
+    _, t, mem = measure(predict_batch, model, raw, preprocessor_path=preprocessor_path)
+    out["predict_batch"] = {"seconds": t, "peak_mb": mem, "rows_per_s": len(raw) / t}
+
+    # 4. Độ trễ dự đoán đơn lẻ
+    rows = raw.drop(columns=["customerID"]).head(n_single).to_dict("records")
+    predict_single(model, rows[0], preprocessor_path=preprocessor_path)  # warm-up
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        predict_single(model, row, preprocessor_path=preprocessor_path)
+        latencies.append(time.perf_counter() - start)
+    lat_ms = np.array(latencies) * 1000
+    out["predict_single"] = {
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p95_ms": float(np.percentile(lat_ms, 95)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+    }
+    return out
+
+def median_report(runs):
+    """Gộp nhiều lần chạy bench_size: median của từng chỉ số"""
+    merged = {}
+    for stage, stage_metrics in runs[0].items():
+        merged[stage] = {}
+        for key in stage_metrics:
+            values = [run[stage][key] for run in runs if run.get(stage, {}).get(key) is not None]
+            merged[stage][key] = float(np.median(values)) if values else None
+    return merged
+
+def compare(current, baseline, tolerance=0.2, min_delta_ms=1.0):
+    """
+    So sánh hai lần chạy; trả về danh sách chỉ số tệ đi quá `tolerance` (tỉ lệ) và
+    đồng thời quá min_delta_ms (chênh lệch tuyệt đối, xem _min_delta).
+    """
+    regressions = []
+    for size, stages in current["results"].items():
+        for stage, metrics in stages.items():
+            base_metrics = baseline.get("results", {}).get(size, {}).get(stage, {})
+            for key, value in metrics.items():
+                base = base_metrics.get(key)
+                if not base or value is None:
+                    continue
+                if key in HIGHER_IS_BETTER:
+                    change = (base - value) / base
+                    # Throughput suy ra từ thời gian của cùng bước: áp cùng ngưỡng tuyệt đối
+                    seconds, base_seconds = metrics.get("seconds"), base_metrics.get("seconds")
+                    if seconds is not None and base_seconds is not None and \
+                            seconds - base_seconds < _min_delta("seconds", min_delta_ms):
+                        continue
+                else:
+                    change = (value - base) / base
+                    if value - base < _min_delta(key, min_delta_ms):
+                        continue
+                if change > tolerance:
+                    regressions.append({"size": size, "stage": stage, "metric": key,
+                                        "baseline": base, "current": value, "change": change})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark huấn luyện và dự đoán churn")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="Các kích thước dữ liệu, phân tách bằng dấu phẩy")
+    parser.add_argument("--single", type=int, default=1000,
+                        help="Số request dùng để đo độ trễ predict_single")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="File JSON của lần chạy trước để so sánh")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Ngưỡng tệ đi (0.2 = 20%%) để báo regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Bỏ qua chênh lệch thời gian tuyệt đối nhỏ hơn ngưỡng này (ms)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Số lần chạy mỗi kích thước, lấy median từng chỉ số")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        print(f"\n=== {size:,} dòng ===")
+        runs = [bench_size(size, n_single=args.single) for _ in range(max(1, args.repeat))]
+        report["results"][str(size)] = median_report(runs)
+        for stage, metrics in report["results"][str(size)].items():
+            print(f"{stage:<35} " + "  ".join(f"{k}={v:.4f}" for k, v in metrics.items()))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nĐã ghi kết quả tại: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        for r in regressions:
+            print(f"REGRESSION {r['size']} {r['stage']} {r['metric']}: "
+                  f"{r['baseline']:.4f} -> {r['current']:.4f} ({r['change']:+.0%})")
+        if regressions:
+            return 1
+        print("Không có regression.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
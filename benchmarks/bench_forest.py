@@ -0,0 +1,92 @@
+"""
+=============================================================================
+BENCHMARK - RANDOM FOREST: SKLEARN vs BẢNG NODE PHẲNG (FlatForest)
+=============================================================================
+Huấn luyện Random Forest như trong train_and_evaluate rồi so sánh predict_proba:
+    - 1 dòng (độ trễ, p50 trên nhiều lần gọi)
+    - khối 100k dòng (throughput)
+cho sklearn, FlatForest thuần NumPy (không fallback) và FlatForest mặc định
+(tự chuyển sang sklearn với khối lớn).
+
+    python benchmarks/bench_forest.py --rows 100000 --threads 1,4
+=============================================================================
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from src.preprocessing import load_data, preprocess
+from src.modeling import get_models
+from src.forest_scorer import FlatForest
+
+DATA_PATH = os.path.join(parent_dir, "data", "customer_churn.csv")
+
+def p50_latency_ms(func, x, repeat):
+    func(x)  # warm-up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(x)
+        times.append(time.perf_counter() - start)
+    return float(np.percentile(times, 50) * 1000)
+
+def throughput(func, X):
+    start = time.perf_counter()
+    func(X)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "rows_per_s": len(X) / elapsed}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="So sánh sklearn và FlatForest")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--threads", default="1", help="Số luồng cho FlatForest, vd: 1,4")
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    args = parser.parse_args(argv)
+
+    X_train, X_test, y_train, y_test, _ = preprocess(load_data(DATA_PATH),
+                                                     save_artifacts_path=tempfile.mkdtemp() + os.sep)
+    rf = get_models()["Random Forest"].fit(X_train, y_train)
+    flat = FlatForest.from_sklearn(rf, keep_model=False)
+    hybrid = FlatForest.from_sklearn(rf)
+
+    # Kiểm tra kết quả giống sklearn
+    diff = np.abs(flat.predict_proba(X_test) - rf.predict_proba(X_test)).max()
+    print(f"Sai khác lớn nhất so với sklearn: {diff:.2e}")
+
+    rng = np.random.default_rng(42)
+    X_big = X_test[rng.integers(0, len(X_test), args.rows)]
+    x_one = X_test[:1]
+
+    report = {"max_abs_diff": float(diff), "n_trees": flat.n_trees, "rows": args.rows}
+    report["sklearn"] = {"p50_1row_ms": p50_latency_ms(rf.predict_proba, x_one, args.repeat),
+                         "batch": throughput(rf.predict_proba, X_big)}
+    report["flat_hybrid"] = {"p50_1row_ms": p50_latency_ms(hybrid.predict_proba, x_one, args.repeat),
+                             "batch": throughput(hybrid.predict_proba, X_big)}
+    for n_threads in [int(t) for t in args.threads.split(",") if t]:
+        func = lambda X, n=n_threads: flat.predict_proba(X, n_threads=n)
+        report[f"flat_numpy_{n_threads}thr"] = {"p50_1row_ms": p50_latency_ms(func, x_one, args.repeat),
+                                                "batch": throughput(func, X_big)}
+
+    print(f"{'Scorer':<20} | {'1 dòng p50 (ms)':<16} | {f'{args.rows:,} dòng (s)':<16} | rows/s")
+    print("-" * 75)
+    for name, r in report.items():
+        if isinstance(r, dict) and "batch" in r:
+            print(f"{name:<20} | {r['p50_1row_ms']:<16.3f} | {r['batch']['seconds']:<16.3f} | "
+                  f"{r['batch']['rows_per_s']:,.0f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
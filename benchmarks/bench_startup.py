@@ -0,0 +1,113 @@
+"""
+=============================================================================
+BENCHMARK - THỜI GIAN KHỞI ĐỘNG (IMPORT + LOAD ARTIFACT)
+=============================================================================
+Mỗi phép đo chạy trong một tiến trình Python mới (cold start), lấy median của
+nhiều lần:
+    - import numpy (mốc so sánh)
+    - import src.predict
+    - import src.predict + load_snapshot + 1 lần predict_single (chỉ NumPy)
+    - import src.predict + load_model/load_preprocessor + predict_single (sklearn)
+Kiểm tra ngân sách: import src.predict không vượt --budget-ms và không kéo theo
+pandas/sklearn. Mã thoát 1 nếu vượt ngân sách. Kiểm tra tự động (pytest) nằm ở
+tests/test_startup.py; script này là báo cáo chi tiết.
+
+    python benchmarks/bench_startup.py --budget-ms 400
+=============================================================================
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+MODELS_DIR = os.path.join(parent_dir, "models")
+DATA_PATH = os.path.join(parent_dir, "data", "customer_churn.csv")
+
+# Mã chạy trong tiến trình con; in JSON {"ms": ..., "heavy": [...]} ra stdout
+_PROBE = """
+import sys, time, json, csv
+start = time.perf_counter()
+{body}
+ms = (time.perf_counter() - start) * 1000
+heavy = [m for m in ("pandas", "sklearn", "scipy", "joblib") if m in sys.modules]
+print(json.dumps({{"ms": ms, "heavy": heavy}}))
+"""
+
+def _row():
+    import csv
+    with open(DATA_PATH, newline="") as f:
+        row = next(csv.DictReader(f))
+    row.pop("customerID", None)
+    row.pop("Churn", None)
+    return row
+
+def probe(body, repeat):
+    """Median thời gian (ms) của `body` trong tiến trình mới, cùng danh sách module nặng đã import"""
+    times, heavy = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(body=body)], cwd=parent_dir,
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(r["ms"])
+        heavy = r["heavy"]
+    return {"ms": float(np.median(times)), "heavy": heavy}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động và kiểm tra ngân sách import")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=400.0,
+                        help="Ngân sách cho import src.predict (ms)")
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    args = parser.parse_args(argv)
+
+    row = repr(_row())
+    snapshot_path = os.path.join(tempfile.mkdtemp(), "snapshot.npz")
+    subprocess.run([sys.executable, "-m", "src.predict", "export-snapshot",
+                    "--output", snapshot_path], cwd=parent_dir, check=True, capture_output=True)
+
+    cases = {
+        "import_numpy": "import numpy",
+        "import_predict": "import src.predict",
+        "snapshot_predict_single": (
+            "from src.predict import load_snapshot\n"
+            f"load_snapshot({snapshot_path!r}).predict_single({row})"
+        ),
+        "sklearn_predict_single": (
+            "from src.predict import load_model, predict_single\n"
+            f"predict_single(load_model({os.path.join(MODELS_DIR, 'model.pkl')!r}), {row}, "
+            f"preprocessor_path={os.path.join(MODELS_DIR, 'preprocessor.pkl')!r})"
+        ),
+    }
+    report = {name: probe(body, args.repeat) for name, body in cases.items()}
+
+    print(f"{'Bước':<26} | {'ms (median)':<12} | Module nặng đã import")
+    print("-" * 70)
+    for name, r in report.items():
+        print(f"{name:<26} | {r['ms']:<12.1f} | {', '.join(r['heavy']) or '-'}")
+
+    failures = []
+    if report["import_predict"]["ms"] > args.budget_ms:
+        failures.append(f"import src.predict {report['import_predict']['ms']:.0f} ms > {args.budget_ms:.0f} ms")
+    for name in ("import_predict", "snapshot_predict_single"):
+        if report[name]["heavy"]:
+            failures.append(f"{name} import {report[name]['heavy']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"budget_ms": args.budget_ms, "report": report, "failures": failures}, f, indent=2)
+
+    if failures:
+        print("VƯỢT NGÂN SÁCH:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print(f"Trong ngân sách ({args.budget_ms:.0f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,10 +32,12 @@ sys.path.insert(0, parent_dir)
 
 # Import functions từ module predict.py
 try:
-    from src.predict import load_model, predict_single
+    from src.predict import (load_model, load_preprocessor, predict_single, result_cache,
+                             explain_single)
 except ImportError:
     try:
-        from predict import load_model, predict_single
+        from predict import (load_model, load_preprocessor, predict_single, result_cache,
+                             explain_single)
     except ImportError as e:
         st.error(f"❌ Không thể import module predict: {e}")
         st.stop()
@@ -66,7 +68,8 @@ st.markdown("""
 # PHẦN 4: LOAD MODEL
 # =============================================================================
 
-@st.cache_resource
+# Không dùng st.cache_resource: load_model/load_preprocessor đã cache trong tiến trình và tự
+# load lại khi file trên đĩa thay đổi (khi đó cache kết quả dự đoán cũng tự bị xóa)
 def get_model():
     """Load model từ file pkl"""
     model_path = os.path.join(parent_dir, "models", "model.pkl")
@@ -77,6 +80,13 @@ def get_model():
         st.info(f"📂 Project root: `{parent_dir}`")
         st.stop()
     
+    # Load trước preprocessor vào cache để lần dự đoán đầu tiên không phải đọc đĩa
+    preprocessor_path = os.path.join(parent_dir, "models", "preprocessor.pkl")
+    if not os.path.exists(preprocessor_path):
+        st.error(f"❌ Không tìm thấy preprocessor tại: `{preprocessor_path}`")
+        st.stop()
+    load_preprocessor(preprocessor_path)
+    
     return load_model(model_path)
 
 # Load model
@@ -87,6 +97,29 @@ except Exception as e:
     st.info("💡 Hãy chạy `modeling.py` hoặc notebook để train model trước!")
     st.stop()
 
+# Tên hiển thị của các đặc trưng (dùng cho phần giải thích dự đoán)
+FEATURE_LABELS = {
+    'gender': "Giới tính",
+    'SeniorCitizen': "Người cao tuổi",
+    'Partner': "Có bạn đời",
+    'Dependents': "Người phụ thuộc",
+    'tenure': "Thâm niên (tháng)",
+    'PhoneService': "Dịch vụ thoại",
+    'MultipleLines': "Nhiều đường dây",
+    'InternetService': "Internet",
+    'OnlineSecurity': "Bảo mật Online",
+    'OnlineBackup': "Sao lưu Online",
+    'DeviceProtection': "Bảo vệ thiết bị",
+    'TechSupport': "Hỗ trợ kỹ thuật",
+    'StreamingTV': "Truyền hình (Streaming TV)",
+    'StreamingMovies': "Phim ảnh (Streaming Movies)",
+    'Contract': "Loại hợp đồng",
+    'PaperlessBilling': "Hóa đơn điện tử",
+    'PaymentMethod': "Phương thức thanh toán",
+    'MonthlyCharges': "Cước hàng tháng ($)",
+    'TotalCharges': "Tổng cước tích lũy ($)"
+}
+
 # =============================================================================
 # PHẦN 5: HEADER
 # =============================================================================
@@ -172,13 +205,7 @@ col1, col2 = st.columns([1.5, 1])
 with col1:
     st.subheader("📋 Dữ liệu đầu vào")
     
-    # Hàm encode giá trị categorical thành số
-    def get_index(value, options):
-        """Trả về index của value trong list options đã sort A-Z"""
-        options_sorted = sorted(options)
-        return options_sorted.index(value)
-    
-    # Chuẩn bị dictionary input với encoding
+    # Chuẩn bị dictionary input (dữ liệu thô)
     input_data_display = {
         'gender': gender,
         'SeniorCitizen': senior_citizen,
@@ -201,28 +228,9 @@ with col1:
         'TotalCharges': total_charges
     }
     
-    # Dictionary cho model (đã encode thành số)
-    input_data = {
-        'gender': get_index(gender, ['Female', 'Male']),
-        'SeniorCitizen': 1 if senior_citizen == 'Yes' else 0,
-        'Partner': get_index(partner, ['No', 'Yes']),
-        'Dependents': get_index(dependents, ['No', 'Yes']),
-        'tenure': tenure,
-        'PhoneService': get_index(phone_service, ['No', 'Yes']),
-        'MultipleLines': get_index(multiple_lines, ['No', 'No phone service', 'Yes']),
-        'InternetService': get_index(internet_service, ['DSL', 'Fiber optic', 'No']),
-        'OnlineSecurity': get_index(online_security, ['No', 'No internet service', 'Yes']),
-        'OnlineBackup': get_index(online_backup, ['No', 'No internet service', 'Yes']),
-        'DeviceProtection': get_index(device_protection, ['No', 'No internet service', 'Yes']),
-        'TechSupport': get_index(tech_support, ['No', 'No internet service', 'Yes']),
-        'StreamingTV': get_index(streaming_tv, ['No', 'No internet service', 'Yes']),
-        'StreamingMovies': get_index(streaming_movies, ['No', 'No internet service', 'Yes']),
-        'Contract': get_index(contract, ['Month-to-month', 'One year', 'Two year']),
-        'PaperlessBilling': get_index(paperless_billing, ['No', 'Yes']),
-        'PaymentMethod': get_index(payment_method, ['Bank transfer (automatic)', 'Credit card (automatic)', 'Electronic check', 'Mailed check']),
-        'MonthlyCharges': monthly_charges,
-        'TotalCharges': total_charges
-    }
+    # Dictionary cho model: giữ nguyên dữ liệu thô, preprocessor.pkl sẽ mã hóa + chuẩn hóa
+    # (SeniorCitizen trong dữ liệu gốc là 0/1)
+    input_data = dict(input_data_display, SeniorCitizen=1 if senior_citizen == 'Yes' else 0)
     
     # Hiển thị dạng bảng (dùng data gốc để dễ đọc)
     df_display = pd.DataFrame([input_data_display]).T
@@ -238,11 +246,14 @@ with col2:
     if st.button("🚀 Phân Tích Ngay", type="primary", use_container_width=True):
         try:
             with st.spinner("⏳ Đang phân tích dữ liệu..."):
-                # Đường dẫn scaler
+                # Đường dẫn scaler và preprocessor
                 scaler_path = os.path.join(parent_dir, "models", "scaler.pkl")
+                preprocessor_path = os.path.join(parent_dir, "models", "preprocessor.pkl")
                 
-                # Gọi hàm dự đoán
-                result = predict_single(model, input_data, scaler_path=scaler_path)
+                # Gọi hàm dự đoán (mã hóa dữ liệu thô bằng preprocessor đã lưu lúc train);
+                # hồ sơ đã chấm trước đó được lấy lại từ cache kết quả
+                result = predict_single(model, input_data, scaler_path=scaler_path,
+                                        preprocessor_path=preprocessor_path, cache=result_cache)
                 
                 # Lưu kết quả vào session state
                 st.session_state.last_prediction = result
@@ -270,6 +281,8 @@ with col2:
                 
                 # Progress bar
                 st.progress(prob)
+                cache_stats = result_cache.stats()
+                st.caption(f"Cache: {cache_stats['hits']} lần trúng / {cache_stats['misses']} lần trượt")
                 
                 # Phân tích mức độ rủi ro
                 st.markdown("---")
@@ -284,26 +297,15 @@ with col2:
                 
                 st.write(f"**Mức độ rủi ro:** {risk_level}")
                 
-                # Phân tích các yếu tố ảnh hưởng
+                # Phân tích các yếu tố ảnh hưởng: đóng góp của từng đặc trưng theo chính model
                 st.markdown("**Các yếu tố chính:**")
-                factors = []
+                factors = explain_single(model, input_data, preprocessor_path, k=5)
                 
-                if contract == 'Month-to-month':
-                    factors.append("• Hợp đồng ngắn hạn (tăng rủi ro)")
-                if tenure < 12:
-                    factors.append("• Khách hàng mới (tăng rủi ro)")
-                if internet_service == 'Fiber optic' and online_security == 'No':
-                    factors.append("• Không dùng dịch vụ bảo mật")
-                if payment_method == 'Electronic check':
-                    factors.append("• Thanh toán qua séc điện tử")
-                if monthly_charges > 70:
-                    factors.append("• Chi phí tháng cao")
-                
-                if factors:
-                    for f in factors:
-                        st.markdown(f)
-                else:
-                    st.markdown("• Hồ sơ khách hàng ổn định ✓")
+                for f in factors:
+                    label = FEATURE_LABELS.get(f["feature"], f["feature"])
+                    value = input_data_display[f["feature"]]
+                    effect = "tăng rủi ro" if f["contribution"] > 0 else "giảm rủi ro"
+                    st.markdown(f"• {label} = {value} ({effect}, {f['contribution']:+.3f})")
                     
         except FileNotFoundError as e:
             st.error("❌ Không tìm thấy file model hoặc scaler!")
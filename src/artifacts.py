@@ -0,0 +1,276 @@
+import os
+import io
+import json
+import mmap
+import uuid
+import pickle
+import hashlib
+import threading
+
+def file_hash(filepath, block_size=1 << 20):
+    """SHA-256 của nội dung file"""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _joblib_load(filepath):
+    # joblib chỉ import khi cần (loader mặc định)
+    import joblib
+    return joblib.load(filepath)
+
+class ArtifactRegistry:
+    """
+    Bộ nhớ đệm trong tiến trình cho model/scaler đã load.
+    Mỗi artifact được khóa theo đường dẫn tuyệt đối + (mtime, size) của file;
+    khi file trên đĩa thay đổi thì lần gọi tiếp theo sẽ tự load lại.
+    Với use_hash=True, khóa dùng thêm SHA-256 nội dung (chậm hơn nhưng chắc chắn hơn).
+    """
+
+    def __init__(self, use_hash=False):
+        self.use_hash = use_hash
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fingerprint(self, filepath):
+        st = os.stat(filepath)
+        fp = (st.st_mtime_ns, st.st_size)
+        if self.use_hash:
+            fp = fp + (file_hash(filepath),)
+        return fp
+
+    def get(self, filepath, loader=None):
+        """Trả về artifact đã load; chỉ đọc đĩa khi chưa có trong cache hoặc file đã đổi."""
+        path = os.path.abspath(filepath)
+        fingerprint = self._fingerprint(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == fingerprint:
+                self.hits += 1
+                return entry[1]
+
+        obj = (loader or _joblib_load)(path)
+
+        with self._lock:
+            self._entries[path] = (fingerprint, obj)
+            self.misses += 1
+        return obj
+
+    def version(self, filepath):
+        """Fingerprint hiện tại của artifact (dùng làm phiên bản model)"""
+        return self._fingerprint(os.path.abspath(filepath))
+
+    def warm_up(self, *filepaths, loader=None):
+        """Load trước các artifact (ví dụ lúc khởi động service)"""
+        for filepath in filepaths:
+            self.get(filepath, loader)
+
+    def evict(self, filepath=None):
+        """Xóa một artifact khỏi cache, hoặc toàn bộ cache nếu không truyền đường dẫn"""
+        with self._lock:
+            if filepath is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(filepath), None)
+
+    def __contains__(self, filepath):
+        return os.path.abspath(filepath) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+# Registry dùng chung cho cả tiến trình
+registry = ArtifactRegistry()
+
+def get_artifact(filepath, loader=None):
+    """Lấy artifact từ registry dùng chung"""
+    return registry.get(filepath, loader)
+
+def warm_up(*filepaths, loader=None):
+    """Load trước artifact vào registry dùng chung"""
+    registry.warm_up(*filepaths, loader=loader)
+
+def evict(filepath=None):
+    """Xóa artifact khỏi registry dùng chung"""
+    registry.evict(filepath)
+
+# =============================================================================
+# Định dạng artifact có phiên bản: thư mục gồm manifest.json + khung pickle
+# (protocol 5) + file nhị phân chứa các mảng NumPy không nén, load bằng mmap.
+# Mỗi lần lưu ghi ra file tên mới rồi mới thay manifest.json (os.replace), nên
+# tiến trình đang memory-map bản cũ không bị đổi dữ liệu dưới chân.
+# =============================================================================
+
+ARTIFACT_FORMAT = "churn-model"
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+_ALIGN = 64
+
+# Global được phép trong khung pickle (ngoài các lớp sklearn/NumPy, xem _SafeUnpickler)
+_SAFE_GLOBALS = {
+    ("numpy._core.multiarray", "_reconstruct"), ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "scalar"), ("numpy.core.multiarray", "scalar"),
+    ("numpy._core.numeric", "_frombuffer"), ("numpy.core.numeric", "_frombuffer"),
+    ("builtins", "set"), ("builtins", "frozenset"), ("builtins", "slice"),
+    ("builtins", "complex"), ("builtins", "bytearray"), ("collections", "OrderedDict"),
+    ("src.preprocessing", "ChurnPreprocessor"), ("preprocessing", "ChurnPreprocessor"),
+}
+
+class ArtifactError(Exception):
+    """Artifact hỏng, sai phiên bản hoặc sai checksum"""
+
+class _SafeUnpickler(pickle.Unpickler):
+    """
+    Chỉ dựng lại lớp của sklearn/NumPy và các global trong _SAFE_GLOBALS; hàm tùy ý
+    (os.system, eval, ...) trong khung bị từ chối thay vì được gọi.
+    """
+
+    def find_class(self, module, name):
+        if (module, name) in _SAFE_GLOBALS:
+            return super().find_class(module, name)
+        if module.split(".")[0] in ("sklearn", "numpy"):
+            obj = super().find_class(module, name)
+            if isinstance(obj, type):
+                return obj
+        raise ArtifactError(f"Khung artifact chứa global không được phép: {module}.{name}")
+
+def _dump_part(obj, dirpath, name):
+    """
+    Ghi obj thành <name>-<id>.skel (pickle protocol 5, mảng NumPy tách ra ngoài)
+    và <name>-<id>.bin (dữ liệu thô của các mảng, căn lề 64 byte). <id> mới cho mỗi
+    lần lưu: không bao giờ ghi đè file mà tiến trình khác có thể đang memory-map.
+    Trả về mô tả phần này cho manifest.
+    """
+    buffers = []
+    skeleton = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+
+    stem = f"{name}-{uuid.uuid4().hex[:12]}"
+    skel_file, bin_file = f"{stem}.skel", f"{stem}.bin"
+    with open(os.path.join(dirpath, skel_file), "wb") as f:
+        f.write(skeleton)
+
+    layout = []
+    pos = 0
+    with open(os.path.join(dirpath, bin_file), "wb") as f:
+        for buf in buffers:
+            raw = buf.raw()
+            pad = -pos % _ALIGN
+            f.write(b"\0" * pad)
+            pos += pad
+            layout.append([pos, raw.nbytes])
+            f.write(raw)
+            pos += raw.nbytes
+
+    return {
+        "skeleton": skel_file,
+        "data": bin_file,
+        "buffers": layout,
+        "sha256": {skel_file: file_hash(os.path.join(dirpath, skel_file)),
+                   bin_file: file_hash(os.path.join(dirpath, bin_file))},
+    }
+
+def _load_part(dirpath, part, mmap_data):
+    """Dựng lại object từ khung pickle + các buffer (memory-map hoặc đọc vào RAM)"""
+    with open(os.path.join(dirpath, part["skeleton"]), "rb") as f:
+        skeleton = f.read()
+
+    data_path = os.path.join(dirpath, part["data"])
+    if not part["buffers"]:
+        data = b""
+    elif mmap_data:
+        with open(data_path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        with open(data_path, "rb") as f:
+            data = f.read()
+
+    view = memoryview(data)
+    buffers = [view[offset:offset + size] for offset, size in part["buffers"]]
+    return _SafeUnpickler(io.BytesIO(skeleton), buffers=buffers).load()
+
+def _part_files(manifest):
+    return {filename for part in manifest["parts"].values() for filename in part["sha256"]}
+
+def _remove_stale_parts(dirpath, keep):
+    """
+    Xóa file .skel/.bin không thuộc `keep` (manifest mới + manifest ngay trước đó, để tiến trình
+    vừa đọc manifest cũ vẫn mở được file). Tiến trình đang map file đã xóa vẫn đọc bình thường
+    (POSIX); trên Windows file đang map không xóa được và được giữ lại tới lần lưu sau.
+    """
+    for filename in os.listdir(dirpath):
+        if filename.endswith((".skel", ".bin")) and filename not in keep:
+            try:
+                os.remove(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+
+def save_artifact(dirpath, model, preprocessor=None, features=None, metrics=None):
+    """
+    Lưu model (và preprocessor nếu có) vào thư mục artifact.
+    manifest.json ghi phiên bản định dạng, danh sách feature, metrics lúc train,
+    vị trí từng mảng trong file .bin và SHA-256 từng file.
+    Lưu lại vào thư mục đã có là an toàn với tiến trình đang dùng bản cũ: file mới được ghi
+    trước, manifest.json được thay nguyên tử sau cùng, bản cũ chỉ bị xóa sau một lần lưu nữa.
+    """
+    import sklearn
+
+    os.makedirs(dirpath, exist_ok=True)
+    previous = read_manifest(dirpath) if is_artifact_dir(dirpath) else None
+    parts = {"model": model}
+    if preprocessor is not None:
+        parts["preprocessor"] = preprocessor
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "estimator": type(model).__name__,
+        "sklearn_version": sklearn.__version__,
+        "features": list(features) if features is not None else None,
+        "metrics": {k: float(v) for k, v in (metrics or {}).items()},
+        "parts": {name: _dump_part(obj, dirpath, name) for name, obj in parts.items()},
+    }
+    # Ghi manifest sau cùng: manifest tồn tại nghĩa là artifact đã ghi xong
+    tmp = os.path.join(dirpath, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(dirpath, MANIFEST_NAME))
+    _remove_stale_parts(dirpath, _part_files(manifest) | (_part_files(previous) if previous else set()))
+    return manifest
+
+def read_manifest(dirpath):
+    """Đọc và kiểm tra manifest.json của thư mục artifact"""
+    path = os.path.join(dirpath, MANIFEST_NAME)
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ArtifactError(f"{path}: không phải artifact {ARTIFACT_FORMAT}")
+    if manifest.get("version", 0) > ARTIFACT_VERSION:
+        raise ArtifactError(f"{path}: phiên bản {manifest['version']} mới hơn bản hỗ trợ ({ARTIFACT_VERSION})")
+    return manifest
+
+def load_artifact(dirpath, mmap_data=True, verify=True):
+    """
+    Tải thư mục artifact. Trả về dict {"model", "preprocessor", "manifest"}.
+    mmap_data=True: mảng NumPy trỏ thẳng vào file .bin đã memory-map (chỉ đọc), nên
+    các tiến trình phục vụ cùng đọc một artifact dùng chung page cache.
+    verify=True: kiểm tra SHA-256 từng file với manifest trước khi load.
+    Khung được đọc bằng Unpickler giới hạn (chỉ lớp sklearn/NumPy và ChurnPreprocessor);
+    đây là danh sách cho phép, không phải sandbox: vẫn nên load artifact từ nguồn tin cậy.
+    """
+    manifest = read_manifest(dirpath)
+    loaded = {"model": None, "preprocessor": None, "manifest": manifest}
+    for name, part in manifest["parts"].items():
+        if verify:
+            for filename, checksum in part["sha256"].items():
+                if file_hash(os.path.join(dirpath, filename)) != checksum:
+                    raise ArtifactError(f"{os.path.join(dirpath, filename)}: checksum không khớp với manifest")
+        loaded[name] = _load_part(dirpath, part, mmap_data)
+    return loaded
+
+def is_artifact_dir(path):
+    """True nếu path là thư mục artifact (có manifest.json)"""
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
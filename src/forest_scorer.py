@@ -0,0 +1,132 @@
+"""
+Bộ chấm điểm Random Forest / Decision Tree dạng bảng node phẳng (thuần NumPy).
+
+Tất cả cây được nối thành một bảng node chung (feature, threshold, left, right,
+xác suất lá). Dự đoán duyệt mọi cây cùng lúc cho cả khối dòng: mỗi bước là một
+phép gather vectorized trên mọi cặp (dòng, cây), lặp theo độ sâu cây và
+chỉ giữ lại các cặp (dòng, cây) chưa tới lá, thay vì vòng lặp Python gọi từng
+estimator như sklearn.
+
+Cách này loại bỏ chi phí dispatch Python/joblib của sklearn (chiếm phần lớn thời gian
+với khối nhỏ: 1 dòng ~0.5 ms thay vì ~10 ms với 200 cây). Với khối rất lớn, vòng duyệt
+biên dịch của sklearn vẫn nhanh hơn NumPy trên một lõi, nên khi còn giữ model gốc
+(from_sklearn(..., keep_model=True)) các khối từ `fallback_rows` dòng trở lên được
+chuyển cho sklearn. Xem benchmarks/bench_forest.py.
+
+    scorer = FlatForest.from_sklearn(rf)
+    proba = scorer.predict_proba(X_scaled)             # giống rf.predict_proba
+    proba = scorer.predict_proba(X_scaled, n_threads=4)
+"""
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+class FlatForest:
+    """Rừng cây đã làm phẳng thành bảng node"""
+
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, max_depth, classes,
+                 model=None, fallback_rows=256):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.leaf_proba = np.asarray(leaf_proba, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.classes = np.asarray(classes)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        # Model sklearn gốc (tùy chọn) dùng cho khối lớn
+        self.model = model
+        self.fallback_rows = fallback_rows
+
+    @classmethod
+    def from_sklearn(cls, model, keep_model=True, fallback_rows=256):
+        """Chuyển RandomForestClassifier / DecisionTreeClassifier (nhị phân) đã fit"""
+        estimators = getattr(model, "estimators_", [model])
+        if len(model.classes_) != 2:
+            raise ValueError("Chỉ hỗ trợ phân loại nhị phân")
+
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in estimators:
+            tree = est.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+
+            # Node lá: trỏ về chính nó để vòng lặp duyệt dừng tự nhiên; feature 0 cho an toàn
+            node_ids = np.arange(n) + offset
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+
+            value = tree.value[:, 0, :]
+            probas.append(value[:, 1] / value.sum(axis=1))
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(np.concatenate(features), np.concatenate(thresholds),
+                   np.concatenate(lefts), np.concatenate(rights),
+                   np.concatenate(probas), roots, max_depth, model.classes_,
+                   model=model if keep_model else None, fallback_rows=fallback_rows)
+
+    @property
+    def n_trees(self):
+        """Số cây trong rừng"""
+        return len(self.roots)
+
+    def _proba_block(self, X):
+        """Xác suất churn cho một khối dòng"""
+        n = X.shape[0]
+        # Mỗi cặp (dòng, cây) là một phần tử; chỉ những cặp chưa tới lá mới được duyệt tiếp
+        idx = np.tile(self.roots, n)
+        row = np.repeat(np.arange(n), self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[idx])
+        while active.size:
+            node = idx[active]
+            # sklearn so sánh giá trị float32 của X với threshold float64
+            go_left = X[row[active], self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+            idx[active] = node
+            active = active[~self.is_leaf[node]]
+        return self.leaf_proba[idx].reshape(n, self.n_trees).mean(axis=1)
+
+    def predict_churn_proba(self, X, block_size=1024, n_threads=1):
+        """Xác suất lớp 1 cho từng dòng; chia khối (và luồng) để giới hạn bộ nhớ"""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.model is not None and len(X) >= self.fallback_rows:
+            return self.model.predict_proba(X)[:, 1]
+        blocks = [X[i:i + block_size] for i in range(0, len(X), block_size)]
+        if n_threads > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                parts = list(pool.map(self._proba_block, blocks))
+        else:
+            parts = [self._proba_block(b) for b in blocks]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def predict_proba(self, X, block_size=1024, n_threads=1):
+        """Giống sklearn predict_proba: ma trận (n, 2)"""
+        p = self.predict_churn_proba(X, block_size, n_threads)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X, block_size=1024, n_threads=1):
+        """Giống sklearn predict"""
+        p = self.predict_churn_proba(X, block_size, n_threads)
+        return self.classes[(p > 0.5).astype(np.intp)]
+
+    def save(self, filepath):
+        """Lưu ra .npz (không dùng pickle)"""
+        np.savez(filepath, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, leaf_proba=self.leaf_proba, roots=self.roots,
+                 max_depth=np.array(self.max_depth), classes=self.classes)
+
+    @classmethod
+    def load(cls, filepath):
+        """Đọc bảng node đã lưu"""
+        with np.load(filepath, allow_pickle=False) as data:
+            return cls(data["feature"], data["threshold"], data["left"], data["right"],
+                       data["leaf_proba"], data["roots"], int(data["max_depth"]), data["classes"])
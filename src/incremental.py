@@ -0,0 +1,226 @@
+"""
+Huấn luyện tăng dần (incremental / warm-start) từ dữ liệu mới hằng tháng.
+
+Thay vì chạy lại preprocess + train_and_evaluate trên toàn bộ lịch sử, mỗi lần cập nhật
+chỉ dùng các dòng mới:
+    - Scaler (Logistic Regression): StandardScaler.partial_fit cộng dồn mean/var với các dòng
+      mới, hệ số cũ được ánh xạ sang scaler mới nên dự đoán của model cũ không đổi.
+    - Scaler (Random Forest): giữ nguyên. Cây không đổi khi co giãn đơn điệu, còn ánh xạ lại
+      ngưỡng thì lệch với các giá trị nằm đúng ngưỡng (sklearn so sánh trên float32).
+      Dự đoán của model cũ trên holdout được kiểm tra lại sau bước này (cây: giống hệt từng bit).
+    - Logistic Regression: warm_start từ hệ số cũ, số vòng lặp giới hạn (lr_max_iter).
+    - Random Forest: warm_start thêm `new_trees` cây học trên dữ liệu mới; max_trees giới hạn
+      số cây (bỏ cây cũ nhất).
+    - Decision Tree / SVM: không cập nhật tăng dần được -> cần huấn luyện lại toàn bộ.
+
+Một phần dữ liệu mới (holdout_size) được giữ lại để đo AUC. Drift = reference_auc - AUC
+sau cập nhật; nếu vượt drift_threshold (hoặc model không hỗ trợ cập nhật) và có full_data
+thì huấn luyện lại toàn bộ bằng train_and_evaluate.
+
+    model, preprocessor, report = incremental_update(model, preprocessor, new_df,
+                                                     reference_auc=0.84, full_data=load_all)
+    python -m src.incremental data/new_month.csv --full-data data/customer_churn.csv
+    python -m src.incremental data/new_month.csv --model models/artifact_dir
+"""
+import os
+import sys
+import copy
+import json
+import argparse
+import warnings
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+try:
+    from src.preprocessing import ChurnPreprocessor, load_data, _encode_dataset, _split_and_scale
+    from src.modeling import train_and_evaluate, save_model
+    from src.instrumentation import stage
+    from src.predict import load_model, MODELS_DIR
+    from src.schema import FEATURE_COLUMNS
+    from src.artifacts import is_artifact_dir
+except ImportError:
+    from preprocessing import ChurnPreprocessor, load_data, _encode_dataset, _split_and_scale
+    from modeling import train_and_evaluate, save_model
+    from instrumentation import stage
+    from predict import load_model, MODELS_DIR
+    from schema import FEATURE_COLUMNS
+    from artifacts import is_artifact_dir
+
+STATE_NAME = "incremental_state.json"
+
+def _labels(df):
+    """Churn -> 0/1, cùng mã với LabelEncoder lúc train (No=0, Yes=1)"""
+    return (df["Churn"].astype(str) == "Yes").astype(int).to_numpy()
+
+def _rescale_linear(model, old, new):
+    """Đổi hệ số LR để model cho cùng kết quả trên dữ liệu chuẩn hóa bằng scaler mới"""
+    # z = c·(x - m)/s + b = c·s'/s · (x - m')/s' + c·(m' - m)/s + b
+    coef = model.coef_ * (new.scale_ / old.scale_)
+    model.intercept_ = model.intercept_ + model.coef_ @ ((new.mean_ - old.mean_) / old.scale_)
+    model.coef_ = coef
+
+# Các model cập nhật tăng dần được
+SUPPORTED_MODELS = (LogisticRegression, RandomForestClassifier)
+
+def _warm_update(model, X, y, new_trees, max_trees, lr_max_iter):
+    """Cập nhật model tại chỗ bằng các dòng mới (LR hoặc RF)"""
+    if isinstance(model, LogisticRegression):
+        max_iter = model.max_iter
+        model.set_params(warm_start=True, max_iter=lr_max_iter)
+        with warnings.catch_warnings():
+            # Số vòng lặp giới hạn có chủ đích: giữ hệ số gần nghiệm cũ
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            model.fit(X, y)
+        model.set_params(warm_start=False, max_iter=max_iter)
+    else:
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+        model.fit(X, y)
+        if max_trees is not None and len(model.estimators_) > max_trees:
+            model.estimators_ = model.estimators_[-max_trees:]
+        model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+
+def _full_retrain(full_data, n_jobs):
+    """Huấn luyện lại toàn bộ (như pipeline gốc). Trả về (model, preprocessor, AUC tốt nhất)."""
+    df = full_data() if callable(full_data) else full_data
+    preprocessor, X, y = _encode_dataset(df)
+    X_train, X_test, y_train, y_test, _ = _split_and_scale(preprocessor, X, y, None)
+    model, results = train_and_evaluate(X_train, y_train, X_test, y_test, n_jobs=n_jobs)
+    best_auc = max(r["auc"] for r in results.values())
+    return model, preprocessor, best_auc
+
+def incremental_update(model, preprocessor, new_df, reference_auc=None, drift_threshold=0.02,
+                       holdout_size=0.2, new_trees=20, max_trees=None, lr_max_iter=20,
+                       full_data=None, n_jobs=1, random_state=42):
+    """
+    Cập nhật model + preprocessor bằng dữ liệu mới (DataFrame thô có cột Churn).
+    Không sửa model/preprocessor truyền vào (có thể đang nằm trong cache); trả về bản mới.
+    reference_auc: AUC lúc huấn luyện toàn bộ gần nhất; None -> AUC của model cũ trên holdout.
+    full_data: DataFrame toàn bộ lịch sử (hoặc hàm trả về DataFrame) để huấn luyện lại khi drift.
+    Trả về (model, preprocessor, report).
+    """
+    with stage("incremental_update", rows=len(new_df)):
+        if not isinstance(model, SUPPORTED_MODELS):
+            if full_data is None:
+                raise ValueError(f"{type(model).__name__} không hỗ trợ cập nhật tăng dần; "
+                                 "cần full_data để huấn luyện lại toàn bộ")
+            model, preprocessor, best_auc = _full_retrain(full_data, n_jobs)
+            return model, preprocessor, {"rows": len(new_df), "model": type(model).__name__,
+                                         "reference_auc": float(best_auc), "drift": 0.0,
+                                         "needs_full_retrain": True, "full_retrain": True}
+
+        model = copy.deepcopy(model)
+        preprocessor = copy.deepcopy(preprocessor)
+
+        # Giữ DataFrame (tên cột) tới scaler: scaler được fit với feature names
+        X = preprocessor.encode(new_df).astype(np.float64)
+        y = _labels(new_df)
+        X_upd, X_hold, y_upd, y_hold = train_test_split(
+            X, y, test_size=holdout_size, random_state=random_state, stratify=y
+        )
+
+        old_scaler = copy.deepcopy(preprocessor.scaler_)
+        proba_before = model.predict_proba(old_scaler.transform(X_hold))[:, 1]
+        auc_before = roc_auc_score(y_hold, proba_before)
+        if reference_auc is None:
+            reference_auc = auc_before
+
+        # 1. Scaler: LR cộng dồn thống kê rồi ánh xạ hệ số sang scaler mới; RF giữ scaler cũ
+        scaler = preprocessor.scaler_
+        if isinstance(model, LogisticRegression):
+            scaler.partial_fit(X_upd)
+            _rescale_linear(model, old_scaler, scaler)
+        # Model cũ phải cho cùng dự đoán sau bước này (cây: từng bit, LR: sai số làm tròn)
+        rescale_diff = float(np.max(np.abs(
+            model.predict_proba(scaler.transform(X_hold))[:, 1] - proba_before)))
+        tolerance = 1e-9 if isinstance(model, LogisticRegression) else 0.0
+        if rescale_diff > tolerance:
+            raise RuntimeError(f"Dự đoán của model cũ thay đổi sau khi đổi scaler: {rescale_diff:.3g}")
+
+        # 2. Model: warm-start trên các dòng mới
+        _warm_update(model, scaler.transform(X_upd), y_upd, new_trees, max_trees, lr_max_iter)
+        auc_after = roc_auc_score(y_hold, model.predict_proba(scaler.transform(X_hold))[:, 1])
+
+        report = {"rows": len(X), "update_rows": len(X_upd), "holdout_rows": len(X_hold),
+                  "model": type(model).__name__,
+                  "reference_auc": float(reference_auc), "auc_before": float(auc_before),
+                  "auc_after": float(auc_after), "rescale_max_diff": rescale_diff,
+                  "drift": float(reference_auc - auc_after), "full_retrain": False}
+
+        # 3. Drift quá ngưỡng: huấn luyện lại toàn bộ nếu có full_data
+        report["needs_full_retrain"] = report["drift"] > drift_threshold
+        if report["needs_full_retrain"]:
+            if full_data is None:
+                return model, preprocessor, report
+            model, preprocessor, best_auc = _full_retrain(full_data, n_jobs)
+            report.update(full_retrain=True, reference_auc=float(best_auc), drift=0.0)
+        return model, preprocessor, report
+
+def load_state(models_dir=MODELS_DIR):
+    """Trạng thái cập nhật gần nhất (reference_auc, số lần cập nhật, ...)"""
+    path = os.path.join(models_dir, STATE_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state, models_dir=MODELS_DIR):
+    with open(os.path.join(models_dir, STATE_NAME), "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+def main(argv=None):
+    """CLI: python -m src.incremental new.csv [--full-data all.csv]"""
+    parser = argparse.ArgumentParser(description="Cập nhật model bằng dữ liệu mới")
+    parser.add_argument("input", help="CSV dữ liệu mới (schema customer_churn.csv, có cột Churn)")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--model", help="model.pkl hoặc thư mục artifact (mặc định <models-dir>/model.pkl)")
+    parser.add_argument("--full-data", help="CSV toàn bộ lịch sử, dùng khi cần huấn luyện lại")
+    parser.add_argument("--drift-threshold", type=float, default=0.02)
+    parser.add_argument("--new-trees", type=int, default=20)
+    parser.add_argument("--max-trees", type=int)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    model_path = args.model or os.path.join(args.models_dir, "model.pkl")
+    preprocessor_path = os.path.join(args.models_dir, "preprocessor.pkl")
+    # Không qua cache: model sẽ bị ghi đè ngay trong tiến trình này
+    model = load_model(model_path, use_cache=False)
+    preprocessor = ChurnPreprocessor.load(preprocessor_path)
+    state = load_state(args.models_dir)
+    rows_before = int(np.max(preprocessor.scaler_.n_samples_seen_))
+
+    full_data = (lambda: load_data(args.full_data)) if args.full_data else None
+    model, preprocessor, report = incremental_update(
+        model, preprocessor, load_data(args.input), reference_auc=state.get("reference_auc"),
+        drift_threshold=args.drift_threshold, new_trees=args.new_trees,
+        max_trees=args.max_trees, full_data=full_data, n_jobs=args.n_jobs
+    )
+    print(json.dumps(report, indent=2))
+    if report["needs_full_retrain"] and not report["full_retrain"]:
+        print("Drift vượt ngưỡng: chạy lại với --full-data để huấn luyện lại toàn bộ")
+        return 1
+
+    # Thư mục artifact: save_artifact ghi file part mới và thay manifest nguyên tử,
+    # tiến trình khác đang memory-map bản cũ không bị ảnh hưởng
+    if is_artifact_dir(model_path):
+        save_model(model, model_path, preprocessor=preprocessor, features=FEATURE_COLUMNS)
+    else:
+        save_model(model, model_path)
+    preprocessor.save(preprocessor_path)
+    joblib.dump(preprocessor.scaler_, os.path.join(args.models_dir, "scaler.pkl"))
+    # Scaler của RF không cộng dồn nên đếm số dòng đã dùng trong state
+    rows_seen = int(np.max(preprocessor.scaler_.n_samples_seen_))
+    if not report["full_retrain"]:
+        rows_seen = state.get("rows_seen", rows_before) + report["update_rows"]
+    state = {"reference_auc": report["reference_auc"],
+             "n_updates": 0 if report["full_retrain"] else state.get("n_updates", 0) + 1,
+             "rows_seen": rows_seen}
+    save_state(state, args.models_dir)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
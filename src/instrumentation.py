@@ -0,0 +1,186 @@
+"""
+Đo đạc hot path: thời gian, số dòng, thay đổi bộ nhớ cho từng bước
+(load_data, preprocess, fit/predict từng mô hình, predict_single, predict_batch).
+
+Mặc định tắt (gần như không tốn chi phí). Bật bằng:
+    from src import instrumentation
+    instrumentation.enable()                         # chỉ đo
+    instrumentation.enable(profile_dir="profiles/")  # đo + dump cProfile cho từng bước
+hoặc biến môi trường CHURN_METRICS=1 (CHURN_PROFILE_DIR=... để bật profile).
+
+Xuất kết quả:
+    instrumentation.export_jsonl("metrics.jsonl")    # log có cấu trúc, mỗi dòng một bước
+    instrumentation.export_prometheus("metrics.prom")
+"""
+import os
+import re
+import json
+import time
+import logging
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger("churn.metrics")
+
+def _rss_mb():
+    """Bộ nhớ RSS hiện tại của tiến trình (MB), None nếu không có psutil"""
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss / 2**20
+
+class Instrumentation:
+    """Bộ thu thập số đo theo từng bước (stage)"""
+
+    def __init__(self, max_records=100000):
+        self.enabled = False
+        self.profile_dir = None
+        # Giữ tối đa max_records số đo gần nhất; tổng hợp (_totals) thì cộng dồn toàn bộ
+        self.records = deque(maxlen=max_records)
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._profile_counts = {}
+        self._local = threading.local()
+
+    def enable(self, profile_dir=None):
+        self.enabled = True
+        self.profile_dir = profile_dir
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def disable(self):
+        self.enabled = False
+        self.profile_dir = None
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self._totals = {}
+            self._profile_counts = {}
+
+    def record(self, stage, seconds, rows=None, mem_delta_mb=None):
+        """Ghi một số đo (dùng khi thời gian đã được đo ở nơi khác, ví dụ tiến trình con)"""
+        if not self.enabled:
+            return
+        entry = {"stage": stage, "seconds": seconds, "rows": rows,
+                 "mem_delta_mb": mem_delta_mb, "ts": time.time()}
+        with self._lock:
+            self.records.append(entry)
+            s = self._totals.setdefault(stage, {"calls": 0, "seconds_total": 0.0,
+                                                "seconds_max": 0.0, "rows_total": 0})
+            s["calls"] += 1
+            s["seconds_total"] += seconds
+            s["seconds_max"] = max(s["seconds_max"], seconds)
+            s["rows_total"] += rows or 0
+        logger.debug(json.dumps(entry, ensure_ascii=False))
+
+    @contextmanager
+    def _measure(self, name, rows):
+        info = {"rows": rows}
+        mem_before = _rss_mb()
+        # Chỉ profile bước ngoài cùng: cProfile không cho lồng nhiều profiler cùng lúc
+        depth = getattr(self._local, "depth", 0)
+        profiler = cProfile.Profile() if self.profile_dir and depth == 0 else None
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield info
+        finally:
+            if profiler:
+                profiler.disable()
+            self._local.depth = depth
+            elapsed = time.perf_counter() - start
+            mem_after = _rss_mb()
+            delta = mem_after - mem_before if mem_before is not None else None
+            self.record(name, elapsed, info["rows"], delta)
+            if profiler:
+                self._dump_profile(name, profiler)
+
+    def stage(self, name, rows=None):
+        """
+        Context manager đo một bước; trả về nullcontext khi đang tắt.
+        Giá trị `as` là dict, có thể gán info["rows"] khi số dòng chỉ biết sau khi chạy.
+        """
+        if not self.enabled:
+            return nullcontext({})
+        return self._measure(name, rows)
+
+    def _dump_profile(self, name, profiler):
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+        with self._lock:
+            n = self._profile_counts.get(safe, 0)
+            self._profile_counts[safe] = n + 1
+        profiler.dump_stats(os.path.join(self.profile_dir, f"{safe}-{n}.prof"))
+
+    def summary(self):
+        """Tổng hợp theo bước: số lần, tổng/lớn nhất thời gian, tổng số dòng"""
+        with self._lock:
+            return {name: dict(s) for name, s in self._totals.items()}
+
+    def export_jsonl(self, filepath):
+        """Ghi mỗi số đo (tối đa max_records gần nhất) thành một dòng JSON"""
+        with self._lock:
+            records = list(self.records)
+        with open(filepath, "w", encoding="utf-8") as f:
+            for r in records:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def export_prometheus(self, filepath=None, prefix="churn"):
+        """Xuất dạng text exposition của Prometheus; trả về chuỗi, ghi file nếu có filepath"""
+        lines = []
+        metrics = [
+            ("stage_calls_total", "counter", "calls", "Số lần chạy mỗi bước"),
+            ("stage_seconds_total", "counter", "seconds_total", "Tổng thời gian mỗi bước (giây)"),
+            ("stage_seconds_max", "gauge", "seconds_max", "Thời gian lớn nhất một lần chạy (giây)"),
+            ("stage_rows_total", "counter", "rows_total", "Tổng số dòng đã xử lý"),
+        ]
+        summary = self.summary()
+        for metric, kind, key, help_text in metrics:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for stage_name, s in summary.items():
+                label = stage_name.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{prefix}_{metric}{{stage="{label}"}} {s[key]}')
+        text = "\n".join(lines) + "\n"
+        if filepath:
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+# Bộ thu thập dùng chung cho cả tiến trình
+metrics = Instrumentation()
+
+if os.environ.get("CHURN_METRICS") or os.environ.get("CHURN_PROFILE_DIR"):
+    metrics.enable(profile_dir=os.environ.get("CHURN_PROFILE_DIR"))
+
+def stage(name, rows=None):
+    """Đo một bước bằng bộ thu thập dùng chung"""
+    return metrics.stage(name, rows)
+
+def enable(profile_dir=None):
+    """Bật đo đạc (và cProfile nếu có profile_dir)"""
+    metrics.enable(profile_dir)
+
+def disable():
+    """Tắt đo đạc"""
+    metrics.disable()
+
+def summary():
+    """Tổng hợp số đo theo bước"""
+    return metrics.summary()
+
+def export_jsonl(filepath):
+    """Ghi số đo ra file JSON lines"""
+    metrics.export_jsonl(filepath)
+
+def export_prometheus(filepath=None):
+    """Xuất số đo dạng Prometheus text"""
+    return metrics.export_prometheus(filepath)
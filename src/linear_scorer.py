@@ -0,0 +1,113 @@
+"""
+Bộ chấm điểm Logistic Regression thuần NumPy (không cần pandas/sklearn lúc dự đoán).
+
+StandardScaler được gộp vào hệ số:
+    z = coef · (x - mean) / scale + intercept
+      = (coef / scale) · x + (intercept - coef · mean / scale)
+      = w · x + b
+nên mỗi dự đoán chỉ còn một tích vô hướng; nhãn = z > 0, xác suất = sigmoid(z).
+
+    scorer = export_linear_scorer(model, preprocessor)   # lúc train
+    scorer.save("../models/linear_scorer.npz")
+    scorer = LinearScorer.load("../models/linear_scorer.npz")
+    label, prob = scorer.score_row({"gender": "Male", ...})
+    labels, probs = scorer.score(X_encoded)
+"""
+import json
+import math
+import numpy as np
+
+try:
+    from src.schema import encode_record
+except ImportError:
+    from schema import encode_record
+
+class LinearScorer:
+    """Logistic Regression đã gộp scaler: w · x + b trên dữ liệu đã mã hóa (chưa chuẩn hóa)"""
+
+    def __init__(self, weights, bias, features, classes=(0, 1), categories=None,
+                 total_charges_fill=None):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.features = list(features)
+        self.classes = np.asarray(classes)
+        self.categories = categories or {}
+        self.total_charges_fill = total_charges_fill
+        # Bảng tra cứu cho từng dòng (schema.encode_record) và hệ số dạng float Python
+        self.codes = {col: {value: code for code, value in enumerate(levels)}
+                      for col, levels in self.categories.items()}
+        self._weights = [float(w) for w in self.weights]
+
+    def decision_function(self, X):
+        """z = X · w + b cho ma trận đã mã hóa (n, n_features)"""
+        return np.asarray(X, dtype=np.float64) @ self.weights + self.bias
+
+    def score(self, X):
+        """Dự đoán hàng loạt trên ma trận đã mã hóa. Trả về (nhãn, xác suất churn)."""
+        z = self.decision_function(X)
+        with np.errstate(over="ignore"):
+            prob = 1.0 / (1.0 + np.exp(-z))
+        labels = self.classes[(z > 0).astype(np.intp)]
+        return labels, prob
+
+    def score_row(self, row):
+        """
+        Dự đoán một khách hàng từ dict dữ liệu thô (text hoặc đã mã hóa).
+        Cùng quy tắc kiểm tra với ChurnPreprocessor.encode_row: dữ liệu sai -> ValueError.
+        """
+        values = encode_record(row, self.features, self.codes, self.total_charges_fill)
+        z = self.bias
+        for w, x in zip(self._weights, values):
+            z += w * x
+        # sigmoid ổn định số học cho z âm lớn
+        if z >= 0:
+            prob = 1.0 / (1.0 + math.exp(-z))
+        else:
+            e = math.exp(z)
+            prob = e / (1.0 + e)
+        return int(self.classes[1] if z > 0 else self.classes[0]), prob
+
+    def save(self, filepath):
+        """Lưu ra .npz (không dùng pickle)"""
+        meta = {"features": self.features, "categories": self.categories,
+                "total_charges_fill": self.total_charges_fill}
+        np.savez(filepath, weights=self.weights, bias=np.array(self.bias),
+                 classes=self.classes, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+
+    @classmethod
+    def load(cls, filepath):
+        """Đọc scorer đã lưu bằng save()"""
+        with np.load(filepath, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(data["weights"], float(data["bias"]), meta["features"],
+                       classes=data["classes"], categories=meta["categories"],
+                       total_charges_fill=meta["total_charges_fill"])
+
+def export_linear_scorer(model, preprocessor=None, scaler=None, features=None):
+    """
+    Gộp scaler vào hệ số của LogisticRegression (nhị phân) đã fit.
+    Truyền preprocessor (ChurnPreprocessor) để score_row nhận được dữ liệu thô,
+    hoặc chỉ scaler nếu đầu vào luôn đã mã hóa.
+    """
+    if np.shape(model.coef_)[0] != 1 or len(model.classes_) != 2:
+        raise ValueError("Chỉ hỗ trợ LogisticRegression nhị phân")
+    coef = np.ravel(model.coef_)
+
+    categories = None
+    fill = None
+    if preprocessor is not None:
+        scaler = preprocessor.scaler_
+        categories = preprocessor.categories_
+        fill = preprocessor.total_charges_median_
+    if scaler is None:
+        raise ValueError("Cần preprocessor hoặc scaler để gộp hệ số")
+
+    mean = scaler.mean_ if scaler.with_mean else np.zeros_like(coef)
+    scale = scaler.scale_ if scaler.with_std else np.ones_like(coef)
+    weights = coef / scale
+    bias = float(model.intercept_[0]) - float(np.dot(weights, mean))
+
+    if features is None:
+        features = [str(f) for f in getattr(scaler, "feature_names_in_", range(len(coef)))]
+    return LinearScorer(weights, bias, features, classes=model.classes_,
+                        categories=categories, total_charges_fill=fill)
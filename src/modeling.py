@@ -1,58 +1,290 @@
+import os
 import pickle
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.svm import SVC
+import time
+import numpy as np
+from joblib import Parallel, delayed
 from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.base import clone
 
-def train_and_evaluate(X_train, y_train, X_test, y_test):
+try:
+    from src.artifacts import save_artifact
+    from src.instrumentation import metrics, stage
+except ImportError:
+    from artifacts import save_artifact
+    from instrumentation import metrics, stage
+
+# Từ số dòng này trở lên, SVM RBF chính xác (SVC) được thay bằng bản xấp xỉ
+SVM_LARGE_DATA_THRESHOLD = 20000
+
+def make_svm(n_rows=None, mode="auto", n_features=None):
     """
-    Huấn luyện danh sách các mô hình và trả về kết quả đánh giá.
+    Tạo mô hình SVM RBF.
+    mode="exact": SVC(probability=True) - chi phí ~O(n^2)-O(n^3) kèm Platt 5-fold nội bộ.
+    mode="approx": Nystroem (xấp xỉ kernel RBF) + LinearSVC, xác suất hiệu chỉnh
+    sigmoid riêng bằng CalibratedClassifierCV 3-fold - tuyến tính theo số dòng.
+    mode="auto": chọn "approx" khi n_rows >= SVM_LARGE_DATA_THRESHOLD.
+    """
+    # Import khi cần: module estimator của sklearn chỉ được nạp khi tạo mô hình
+    from sklearn.svm import SVC, LinearSVC
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.pipeline import make_pipeline
+
+    if mode == "auto":
+        mode = "approx" if n_rows is not None and n_rows >= SVM_LARGE_DATA_THRESHOLD else "exact"
+
+    if mode == "exact":
+        return SVC(probability=True, random_state=42)
+    if mode == "approx":
+        # gamma giống gamma='scale' của SVC trên dữ liệu đã chuẩn hóa (phương sai ~1)
+        gamma = 1.0 / n_features if n_features else None
+        return make_pipeline(
+            Nystroem(kernel="rbf", gamma=gamma, n_components=300, random_state=42),
+            CalibratedClassifierCV(LinearSVC(random_state=42), method="sigmoid", cv=3)
+        )
+    raise ValueError(f"mode không hợp lệ: {mode}")
+
+# Tham số SVM tương ứng giữa SVC (exact) và pipeline Nystroem + LinearSVC (approx)
+SVM_APPROX_PARAMS = {"C": "calibratedclassifiercv__estimator__C", "gamma": "nystroem__gamma"}
+
+def _svm_params(model, params, n_features=None):
+    """
+    Đổi tên tham số SVM cho đúng dạng mô hình: params từ search có thể tìm ở mode kia
+    (vd. search chạy SVC nhưng train_and_evaluate dùng bản xấp xỉ khi dữ liệu lớn).
+    gamma="scale" của SVC <-> gamma=None (1/n_features) của Nystroem trên dữ liệu đã chuẩn hóa.
+    """
+    if hasattr(model, "steps"):
+        params = {SVM_APPROX_PARAMS.get(k, k): v for k, v in params.items()}
+        if params.get("nystroem__gamma") == "scale":
+            params["nystroem__gamma"] = 1.0 / n_features if n_features else None
+    else:
+        exact = {v: k for k, v in SVM_APPROX_PARAMS.items()}
+        params = {exact.get(k, k): v for k, v in params.items()}
+        if "gamma" in params and params["gamma"] is None:
+            params["gamma"] = "scale"
+    return params
+
+def get_models(n_jobs=1, n_rows=None, n_features=None, svm_mode="auto", params=None):
+    """
+    Danh sách các mô hình muốn thử nghiệm (random_state cố định để kết quả tái lập được).
+    params: {tên mô hình: {tham số: giá trị}} ghi đè siêu tham số mặc định (vd. kết quả search);
+    tham số SVM được đổi tên theo mode exact/approx đang dùng (xem _svm_params).
     """
-    # Khai báo các mô hình muốn thử nghiệm
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
     models = {
         "Logistic Regression": LogisticRegression(),
-        "Decision Tree": DecisionTreeClassifier(),
-        "Random Forest": RandomForestClassifier(n_estimators=200, random_state=42),
-        "SVM RBF": SVC(probability=True)
+        "Decision Tree": DecisionTreeClassifier(random_state=42),
+        "Random Forest": RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=n_jobs),
+        "SVM RBF": make_svm(n_rows, svm_mode, n_features)
     }
+    for name, overrides in (params or {}).items():
+        if name == "SVM RBF":
+            overrides = _svm_params(models[name], overrides, n_features)
+        models[name].set_params(**overrides)
+    return models
+
+def _fit_and_score(name, model, X_train, y_train, X_test, y_test):
+    """Huấn luyện + đánh giá một mô hình, đo thời gian fit và predict"""
+    # Huấn luyện
+    with stage(f"fit[{name}]", rows=len(X_train)):
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+    # Dự đoán
+    with stage(f"predict[{name}]", rows=len(X_test)):
+        start = time.perf_counter()
+        pred = model.predict(X_test)
+        prob = model.predict_proba(X_test)[:,1]
+        predict_time = time.perf_counter() - start
+
+    # Đánh giá
+    acc = accuracy_score(y_test, pred)
+    auc = roc_auc_score(y_test, prob)
+
+    return name, {"accuracy": acc, "auc": auc, "model": model,
+                  "fit_time": fit_time, "predict_time": predict_time}
+
+def _n_workers(n_jobs, n_models, data_nbytes, max_memory_mb):
+    """Số tiến trình song song, giới hạn theo số CPU, số mô hình và ngân sách bộ nhớ"""
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    workers = max(1, min(n_jobs, n_models))
+    if max_memory_mb is not None:
+        # Ước lượng mỗi worker giữ ~3 bản dữ liệu (input + bản sao nội bộ của estimator)
+        per_worker_mb = 3 * data_nbytes / 2**20
+        workers = max(1, min(workers, int(max_memory_mb // max(per_worker_mb, 1))))
+    return workers
+
+def _cv_fold(name, model, X, y, train_idx, val_idx, latency_repeat=20):
+    """Một fold: fit, AUC/accuracy trên fold validation, độ trễ dự đoán 1 dòng và kích thước model"""
+    X, y = np.asarray(X), np.asarray(y)
+    model = clone(model)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    X_val, y_val = X[val_idx], y[val_idx]
+    start = time.perf_counter()
+    prob = model.predict_proba(X_val)[:, 1]
+    batch_time = time.perf_counter() - start
+
+    # Độ trễ phục vụ 1 khách hàng: median của nhiều lần gọi predict_proba với 1 dòng
+    row = X_val[:1]
+    times = []
+    for _ in range(latency_repeat):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        times.append(time.perf_counter() - start)
+
+    return name, {"auc": roc_auc_score(y_val, prob),
+                  "accuracy": accuracy_score(y_val, model.classes_[(prob > 0.5).astype(int)]),
+                  "fit_time": fit_time,
+                  "batch_us_per_row": batch_time / len(val_idx) * 1e6,
+                  "latency_ms": float(np.median(times)) * 1000,
+                  "size_kb": len(pickle.dumps(model, protocol=5)) / 1024}
+
+def cross_validate_models(X, y, cv=5, n_jobs=1, svm_mode="auto", params=None,
+                          latency_weight=0.001, random_state=42, verbose=True):
+    """
+    So sánh các mô hình bằng k-fold (stratified), mọi cặp (mô hình, fold) chạy song song.
+    Mỗi mô hình: AUC mean/std, accuracy, thời gian fit, độ trễ dự đoán 1 dòng (ms),
+    thời gian dự đoán theo lô (µs/dòng) và kích thước model (KB, pickle).
+    Chọn model theo mục tiêu score = AUC mean - latency_weight * latency_ms
+    (latency_weight = số AUC sẵn sàng đánh đổi cho mỗi ms độ trễ; 0 = chỉ xét AUC).
+    Trả về (tên model được chọn, report).
+    """
+    n_rows, n_features = np.shape(X)
+    models = get_models(n_rows=n_rows * (cv - 1) // cv, n_features=n_features,
+                        svm_mode=svm_mode, params=params)
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(X, y))
+
+    with stage("cross_validate_models", rows=n_rows):
+        outputs = Parallel(n_jobs=n_jobs)(
+            delayed(_cv_fold)(name, model, X, y, tr, va)
+            for name, model in models.items() for tr, va in folds
+        )
+
+    report = {}
+    for name in models:
+        fold_metrics = [m for n, m in outputs if n == name]
+        aucs = [m["auc"] for m in fold_metrics]
+        r = {"auc_mean": float(np.mean(aucs)), "auc_std": float(np.std(aucs))}
+        for key in ("accuracy", "fit_time", "batch_us_per_row", "latency_ms", "size_kb"):
+            r[key] = float(np.mean([m[key] for m in fold_metrics]))
+        r["score"] = r["auc_mean"] - latency_weight * r["latency_ms"]
+        report[name] = r
+    best = max(report, key=lambda n: report[n]["score"])
+
+    if verbose:
+        print(f"{'Model':<20} | {'AUC (mean ± std)':<17} | {'Fit (s)':<8} | {'1 dòng (ms)':<11} | "
+              f"{'Lô (µs/dòng)':<12} | {'Size (KB)':<9} | Score")
+        print("-" * 105)
+        for name, r in report.items():
+            mark = " *" if name == best else ""
+            print(f"{name:<20} | {r['auc_mean']:.4f} ± {r['auc_std']:.4f}   | {r['fit_time']:<8.3f} | "
+                  f"{r['latency_ms']:<11.3f} | {r['batch_us_per_row']:<12.2f} | {r['size_kb']:<9.0f} | "
+                  f"{r['score']:.4f}{mark}")
+        print("-" * 105)
+        print(f"Chọn: {best} ({cv}-fold, latency_weight={latency_weight})")
+    return best, report
+
+def train_and_evaluate(X_train, y_train, X_test, y_test, n_jobs=1, max_memory_mb=None,
+                       svm_mode="auto", params=None, cv=None, latency_weight=0.001):
+    """
+    Huấn luyện danh sách các mô hình và trả về kết quả đánh giá.
+    n_jobs > 1 (hoặc -1 = tất cả CPU): huấn luyện các mô hình song song trên nhiều tiến trình.
+    max_memory_mb: ngân sách bộ nhớ, dùng để giới hạn số tiến trình chạy cùng lúc.
+    svm_mode: "auto" | "exact" | "approx" (xem make_svm).
+    params: siêu tham số ghi đè cho từng mô hình (vd. best_params từ search.successive_halving).
+    cv=k: chọn model bằng k-fold trên tập train (cross_validate_models) với mục tiêu
+    AUC - latency_weight * độ trễ thay vì AUC trên một lần chia; kết quả có thêm results[tên]["cv"].
+    """
+    if cv:
+        best_name, cv_report = cross_validate_models(X_train, y_train, cv=cv, n_jobs=n_jobs,
+                                                     svm_mode=svm_mode, params=params,
+                                                     latency_weight=latency_weight)
+    n_rows, n_features = np.shape(X_train)
+    models = get_models(n_rows=n_rows, n_features=n_features, svm_mode=svm_mode, params=params)
+
+    data_nbytes = sum(np.asarray(a).nbytes for a in (X_train, y_train, X_test, y_test))
+    workers = _n_workers(n_jobs, len(models), data_nbytes, max_memory_mb)
+
+    if workers == 1:
+        # Chạy tuần tự: cho Random Forest dùng n_jobs để tận dụng nhiều lõi
+        models = get_models(n_jobs=n_jobs, n_rows=n_rows, n_features=n_features,
+                            svm_mode=svm_mode, params=params)
+        outputs = [_fit_and_score(name, model, X_train, y_train, X_test, y_test)
+                   for name, model in models.items()]
+    else:
+        # Chạy song song: mỗi mô hình một tiến trình (joblib/loky chia sẻ mảng lớn qua memmap)
+        outputs = Parallel(n_jobs=workers)(
+            delayed(_fit_and_score)(name, model, X_train, y_train, X_test, y_test)
+            for name, model in models.items()
+        )
+        # Số đo trong tiến trình con không về được bộ thu thập của tiến trình chính
+        for name, res in outputs:
+            metrics.record(f"fit[{name}]", res["fit_time"], rows=n_rows)
+            metrics.record(f"predict[{name}]", res["predict_time"], rows=len(X_test))
 
     results = {}
     best_model = None
     best_auc = 0
-    
-    print(f"{'Model':<20} | {'Accuracy':<10} | {'AUC':<10}")
-    print("-" * 46)
 
-    for name, model in models.items():
-        # Huấn luyện
-        model.fit(X_train, y_train)
-        
-        # Dự đoán
-        pred = model.predict(X_test)
-        prob = model.predict_proba(X_test)[:,1]
+    print(f"{'Model':<20} | {'Accuracy':<10} | {'AUC':<10} | {'Fit (s)':<8} | {'Predict (s)':<8}")
+    print("-" * 71)
+
+    # Duyệt theo đúng thứ tự khai báo để kết quả không phụ thuộc thứ tự tiến trình hoàn thành
+    for name, res in outputs:
+        results[name] = res
+        acc, auc = res["accuracy"], res["auc"]
 
-        # Đánh giá
-        acc = accuracy_score(y_test, pred)
-        auc = roc_auc_score(y_test, prob)
-        
-        results[name] = {"accuracy": acc, "auc": auc, "model": model}
-        
-        print(f"{name:<20} | {acc:.4f}     | {auc:.4f}")
+        print(f"{name:<20} | {acc:.4f}     | {auc:.4f}     | {res['fit_time']:<8.3f} | {res['predict_time']:.3f}")
 
         # Lưu lại model tốt nhất dựa trên AUC
         if auc > best_auc:
             best_auc = auc
-            best_model = model
+            best_model = res["model"]
 
-    print("-" * 46)
+    print("-" * 71)
+    if cv:
+        # Chọn theo k-fold; tập test chỉ dùng để báo cáo
+        best_model = results[best_name]["model"]
+        for name, r in cv_report.items():
+            results[name]["cv"] = r
     print(f"Best Model: {best_model}")
-    
+
     return best_model, results
 
-def save_model(model, filepath):
-    """Lưu model ra file .pkl"""
-    with open(filepath, 'wb') as f:
-        pickle.dump(model, f)
-    print(f"Đã lưu model tại: {filepath}")
\ No newline at end of file
+def compare_svm_modes(X_train, y_train, X_test, y_test):
+    """So sánh SVM RBF chính xác và bản xấp xỉ: AUC, chênh lệch AUC và thời gian fit"""
+    n_features = np.shape(X_train)[1]
+    report = {}
+    for mode in ("exact", "approx"):
+        _, res = _fit_and_score(mode, make_svm(mode=mode, n_features=n_features),
+                                X_train, y_train, X_test, y_test)
+        report[mode] = {"auc": res["auc"], "fit_time": res["fit_time"],
+                        "predict_time": res["predict_time"]}
+    report["auc_diff"] = report["approx"]["auc"] - report["exact"]["auc"]
+
+    for mode in ("exact", "approx"):
+        r = report[mode]
+        print(f"SVM {mode:<7} | AUC {r['auc']:.4f} | fit {r['fit_time']:.3f}s | predict {r['predict_time']:.3f}s")
+    print(f"Chênh lệch AUC (approx - exact): {report['auc_diff']:+.4f}")
+    return report
+
+def save_model(model, filepath, preprocessor=None, features=None, metrics=None):
+    """
+    Lưu model. Đường dẫn kết thúc bằng .pkl: file pickle như cũ.
+    Đường dẫn khác: thư mục artifact có phiên bản (manifest + mảng không nén, load bằng memory-map).
+    """
+    if filepath.endswith(".pkl"):
+        with open(filepath, 'wb') as f:
+            pickle.dump(model, f)
+    else:
+        save_artifact(filepath, model, preprocessor=preprocessor, features=features, metrics=metrics)
+    print(f"Đã lưu model tại: {filepath}")
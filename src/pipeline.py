@@ -0,0 +1,250 @@
+"""
+Chấm điểm file rất lớn (out-of-core) với bộ nhớ giới hạn và nhiều worker.
+
+    đọc CSV theo khối ──> pool worker (encode + scale + predict_proba) ──> hàng đợi có giới hạn ──> ghi
+         (luồng chính)        (process hoặc thread)                         (luồng ghi)
+
+- Worker dùng chung model: tiến trình chính load model/preprocessor vào ArtifactRegistry
+  trước khi tạo pool; với start method "fork" các tiến trình con thừa hưởng luôn object
+  đã load (copy-on-write), model dạng thư mục artifact thì được memory-map từ file.
+- Backpressure: tối đa `max_pending` khối đang xử lý và `queue_size` khối chờ ghi; khi bộ ghi
+  chậm thì luồng đọc dừng lại, nên bộ nhớ không tăng theo kích thước file.
+- Ghi tăng dần: CSV (append) hoặc Parquet (thư mục part-00000.parquet, part-00001.parquet, ...).
+- Checkpoint (JSON, ghi nguyên tử) sau mỗi khối đã ghi xong; chạy lại cùng lệnh sẽ bỏ qua các
+  khối đã xong (CSV được cắt về đúng vị trí checkpoint để bỏ phần ghi dở). Checkpoint chỉ
+  dùng lại khi file đầu vào, chunk_size và model/scaler/preprocessor (đường dẫn, kích thước,
+  mtime) đều không đổi; đổi model thì chạy lại từ đầu.
+
+    python -m src.pipeline data/big.csv ket_qua.csv --workers 4
+    python -m src.pipeline data/big.csv ket_qua_parquet/ --format parquet --executor thread
+"""
+import os
+import sys
+import json
+import queue
+import argparse
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pandas as pd
+
+try:
+    from src.predict import load_model, _get_transform, _score_chunk, MODELS_DIR
+    from src.artifacts import is_artifact_dir, MANIFEST_NAME
+    from src.instrumentation import stage
+except ImportError:
+    from predict import load_model, _get_transform, _score_chunk, MODELS_DIR
+    from artifacts import is_artifact_dir, MANIFEST_NAME
+    from instrumentation import stage
+
+CHECKPOINT_VERSION = 1
+
+# Model + hàm biến đổi của worker (mỗi tiến trình một bản, khởi tạo bởi _init_worker)
+_worker = {}
+
+def _init_worker(model_path, scaler_path, preprocessor_path):
+    # Với fork: registry đã có sẵn object từ tiến trình cha nên không đọc lại đĩa
+    _worker["model"] = load_model(model_path)
+    _worker["transform"] = _get_transform(scaler_path, preprocessor_path)
+
+def _score_part(chunk):
+    """Chạy trong worker: chấm điểm một khối dữ liệu thô"""
+    # Dòng sai schema -> ValidationError, checkpoint giữ lại các khối đã ghi xong
+    pred, prob, _ = _score_chunk(_worker["model"], _worker["transform"], chunk)
+    out = pd.DataFrame(index=chunk.index)
+    if "customerID" in chunk.columns:
+        out["customerID"] = chunk["customerID"].to_numpy()
+    out["prediction"] = pred
+    out["probability"] = prob
+    return out.reset_index(drop=True)
+
+def _file_id(path):
+    """(đường dẫn, kích thước, mtime) của một file; thư mục artifact tính theo manifest.json"""
+    if path is None:
+        return None
+    stat_path = os.path.join(path, MANIFEST_NAME) if is_artifact_dir(path) else path
+    if not os.path.exists(stat_path):
+        return [os.path.abspath(path), None, None]
+    st = os.stat(stat_path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+def _input_fingerprint(input_path, chunk_size, model_path, scaler_path, preprocessor_path):
+    st = os.stat(input_path)
+    return {"input": os.path.abspath(input_path), "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns, "chunk_size": chunk_size,
+            "model": _file_id(model_path), "scaler": _file_id(scaler_path),
+            "preprocessor": _file_id(preprocessor_path)}
+
+def _load_checkpoint(path, fingerprint):
+    """Checkpoint hợp lệ cho đúng đầu vào + chunk_size + model, None nếu không có/không khớp"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION or state.get("fingerprint") != fingerprint:
+        return None
+    return state
+
+def _save_checkpoint(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+class _Writer(threading.Thread):
+    """Luồng ghi kết quả theo thứ tự khối và cập nhật checkpoint sau mỗi khối"""
+
+    def __init__(self, output_path, fmt, checkpoint_path, state, queue_size):
+        super().__init__(daemon=True)
+        self.output_path = output_path
+        self.fmt = fmt
+        self.checkpoint_path = checkpoint_path
+        self.state = state
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+
+    def _write(self, out):
+        index = self.state["chunks_done"]
+        if self.fmt == "parquet":
+            part = os.path.join(self.output_path, f"part-{index:05d}.parquet")
+            out.to_parquet(part + ".tmp", index=False)
+            os.replace(part + ".tmp", part)
+        else:
+            header = self.state["output_bytes"] == 0
+            with open(self.output_path, "a", encoding="utf-8", newline="") as f:
+                out.to_csv(f, header=header, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+                self.state["output_bytes"] = f.tell()
+        self.state["chunks_done"] = index + 1
+        self.state["rows_done"] += len(out)
+        _save_checkpoint(self.checkpoint_path, self.state)
+
+    def run(self):
+        while True:
+            out = self.queue.get()
+            if out is None:
+                return
+            if self.error is None:
+                try:
+                    self._write(out)
+                except Exception as e:  # báo lại cho luồng chính
+                    self.error = e
+
+def _prepare_output(output_path, fmt, state):
+    """Đưa file/thư mục kết quả về đúng trạng thái của checkpoint"""
+    if fmt == "parquet":
+        os.makedirs(output_path, exist_ok=True)
+        for name in os.listdir(output_path):
+            # Bỏ các part sau checkpoint (ghi dở hoặc từ lần chạy khác)
+            if name.startswith("part-") and (name.endswith(".tmp")
+                                             or int(name[5:10]) >= state["chunks_done"]):
+                os.remove(os.path.join(output_path, name))
+    elif state["output_bytes"] == 0:
+        open(output_path, "w").close()
+    else:
+        with open(output_path, "r+b") as f:
+            f.truncate(state["output_bytes"])
+
+def score_file(input_path, output_path, model_path=None, preprocessor_path=None,
+               scaler_path=None, chunk_size=50000, n_workers=None, executor="process",
+               queue_size=4, max_pending=None, fmt=None, checkpoint_path=None, resume=True):
+    """
+    Chấm điểm file CSV lớn theo khối, song song, ghi kết quả tăng dần.
+    fmt: "csv" | "parquet" (mặc định suy ra từ output_path: .csv -> csv, còn lại -> parquet).
+    resume=True: tiếp tục từ checkpoint (mặc định <output>.ckpt.json) nếu khớp file đầu vào
+    và model/scaler/preprocessor.
+    Trả về số dòng đã chấm điểm (tính cả phần đã xong trước đó).
+    """
+    model_path = model_path or os.path.join(MODELS_DIR, "model.pkl")
+    scaler_path = scaler_path or os.path.join(MODELS_DIR, "scaler.pkl")
+    fmt = fmt or ("csv" if output_path.lower().endswith(".csv") else "parquet")
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"fmt không hợp lệ: {fmt}")
+    if executor not in ("process", "thread"):
+        raise ValueError(f"executor không hợp lệ: {executor}")
+    n_workers = n_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * n_workers
+    checkpoint_path = checkpoint_path or output_path.rstrip("/\\") + ".ckpt.json"
+
+    fingerprint = _input_fingerprint(input_path, chunk_size, model_path, scaler_path,
+                                     preprocessor_path)
+    state = _load_checkpoint(checkpoint_path, fingerprint) if resume else None
+    if state is None:
+        state = {"version": CHECKPOINT_VERSION, "fingerprint": fingerprint,
+                 "chunks_done": 0, "rows_done": 0, "output_bytes": 0}
+    if state["chunks_done"]:
+        print(f"Tiếp tục từ checkpoint: {state['rows_done']} dòng ({state['chunks_done']} khối) đã xong")
+    _prepare_output(output_path, fmt, state)
+
+    # Load một lần ở tiến trình chính (vào registry) trước khi tạo pool
+    _init_worker(model_path, scaler_path, preprocessor_path)
+    if executor == "process":
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+        pool = ProcessPoolExecutor(n_workers, mp_context=ctx, initializer=_init_worker,
+                                   initargs=(model_path, scaler_path, preprocessor_path))
+    else:
+        pool = ThreadPoolExecutor(n_workers)
+
+    writer = _Writer(output_path, fmt, checkpoint_path, state, queue_size)
+    writer.start()
+    pending = deque()
+    # Bỏ qua các dòng đã chấm điểm (dòng 0 là header)
+    skip = range(1, state["rows_done"] + 1) if state["rows_done"] else None
+    try:
+        with stage("pipeline.score_file") as info:
+            for chunk in pd.read_csv(input_path, chunksize=chunk_size, skiprows=skip):
+                pending.append(pool.submit(_score_part, chunk))
+                # Chờ khối cũ nhất khi đủ max_pending khối đang chạy; put() chặn khi hàng đợi ghi đầy
+                while len(pending) >= max_pending:
+                    writer.queue.put(pending.popleft().result())
+                if writer.error:
+                    raise writer.error
+            while pending:
+                writer.queue.put(pending.popleft().result())
+            writer.queue.put(None)
+            writer.join()
+            info["rows"] = state["rows_done"]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if writer.is_alive():
+            writer.queue.put(None)
+            writer.join()
+    if writer.error:
+        raise writer.error
+
+    if os.path.exists(checkpoint_path):
+        # Hoàn thành: checkpoint không còn cần thiết
+        os.remove(checkpoint_path)
+    return state["rows_done"]
+
+def main(argv=None):
+    """CLI: python -m src.pipeline in.csv out.csv|out_dir [--workers N]"""
+    parser = argparse.ArgumentParser(description="Chấm điểm file CSV lớn theo luồng, song song")
+    parser.add_argument("input", help="File CSV đầu vào (schema customer_churn.csv)")
+    parser.add_argument("output", help="File CSV hoặc thư mục Parquet kết quả")
+    parser.add_argument("--model", default=os.path.join(MODELS_DIR, "model.pkl"))
+    parser.add_argument("--scaler", default=os.path.join(MODELS_DIR, "scaler.pkl"))
+    parser.add_argument("--preprocessor", default=os.path.join(MODELS_DIR, "preprocessor.pkl"),
+                        help="preprocessor.pkl (bỏ qua nếu file không tồn tại)")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--format", choices=["csv", "parquet"])
+    parser.add_argument("--no-resume", action="store_true", help="Bỏ qua checkpoint cũ, chạy lại từ đầu")
+    args = parser.parse_args(argv)
+
+    preprocessor = args.preprocessor if os.path.exists(args.preprocessor) else None
+    n_rows = score_file(args.input, args.output, model_path=args.model,
+                        preprocessor_path=preprocessor, scaler_path=args.scaler,
+                        chunk_size=args.chunk_size, n_workers=args.workers,
+                        executor=args.executor, queue_size=args.queue_size, fmt=args.format,
+                        resume=not args.no_resume)
+    print(f"Đã chấm điểm {n_rows} khách hàng, kết quả lưu tại: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,508 @@
+import os
+import sys
+import copy
+import argparse
 import pickle
-import pandas as pd
-import joblib
+import weakref
 import numpy as np
 
-def load_model(filepath):
-    """Tải model từ file .pkl"""
+# pandas, joblib, sklearn và preprocessing được import khi cần (trong hàm) để import module này
+# nhanh; chấm điểm bằng snapshot (load_snapshot) chỉ cần NumPy.
+try:
+    from src.schema import FEATURE_COLUMNS
+    from src.artifacts import get_artifact, load_artifact, is_artifact_dir, MANIFEST_NAME
+    from src.instrumentation import stage
+    from src.linear_scorer import LinearScorer, export_linear_scorer
+    from src.forest_scorer import FlatForest
+    from src.result_cache import PredictionCache
+    from src.snapshot import ScoringSnapshot
+except ImportError:
+    from schema import FEATURE_COLUMNS
+    from artifacts import get_artifact, load_artifact, is_artifact_dir, MANIFEST_NAME
+    from instrumentation import stage
+    from linear_scorer import LinearScorer, export_linear_scorer
+    from forest_scorer import FlatForest
+    from result_cache import PredictionCache
+    from snapshot import ScoringSnapshot
+
+# Thư mục models/ của project (dùng làm mặc định cho CLI)
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+# Cache kết quả dùng chung cho predict_single(..., cache=result_cache)
+result_cache = PredictionCache(maxsize=10000, ttl=3600)
+
+def _preprocessing():
+    """Module preprocessing (kéo theo pandas + sklearn), chỉ import khi thật sự cần"""
+    try:
+        from src import preprocessing
+    except ImportError:
+        import preprocessing
+    return preprocessing
+
+def _validation():
+    """Module validation (kéo theo pandas), chỉ import khi chấm điểm theo lô"""
+    try:
+        from src import validation
+    except ImportError:
+        import validation
+    return validation
+
+def _joblib_load(filepath):
+    import joblib
+    return joblib.load(filepath)
+
+def _load_preprocessor_file(filepath):
+    return _preprocessing().ChurnPreprocessor.load(filepath)
+
+def _read_pickle(filepath):
     with open(filepath, 'rb') as f:
-        model = pickle.load(f)
-    return model
+        return pickle.load(f)
 
-def predict_single(model, input_dict, scaler_path="../models/scaler.pkl"):
+def _read_artifact_model(manifest_path):
+    return load_artifact(os.path.dirname(manifest_path))["model"]
+
+def load_model(filepath, use_cache=True):
+    """
+    Tải model từ file .pkl hoặc thư mục artifact (xem artifacts.save_artifact).
+    Mặc định dùng cache trong tiến trình: chỉ đọc lại file khi file trên đĩa thay đổi.
+    """
+    if is_artifact_dir(filepath):
+        # Cache theo manifest.json: manifest được ghi lại mỗi lần lưu artifact
+        manifest_path = os.path.join(filepath, MANIFEST_NAME)
+        if not use_cache:
+            return _read_artifact_model(manifest_path)
+        return get_artifact(manifest_path, _read_artifact_model)
+    if not use_cache:
+        return _read_pickle(filepath)
+    return get_artifact(filepath, _read_pickle)
+
+def load_scaler(filepath, use_cache=True):
+    """Tải scaler (joblib), dùng chung cache với load_model"""
+    if not use_cache:
+        return _joblib_load(filepath)
+    return get_artifact(filepath, _joblib_load)
+
+def load_preprocessor(filepath, use_cache=True):
+    """Tải bộ tiền xử lý đã fit (preprocessor.pkl): mã hóa + chuẩn hóa từ dữ liệu thô"""
+    if not use_cache:
+        return _load_preprocessor_file(filepath)
+    return get_artifact(filepath, _load_preprocessor_file)
+
+def load_linear_scorer(filepath, use_cache=True):
+    """Tải bộ chấm điểm Logistic Regression thuần NumPy (linear_scorer.npz)"""
+    if not use_cache:
+        return LinearScorer.load(filepath)
+    return get_artifact(filepath, LinearScorer.load)
+
+def load_snapshot(filepath, use_cache=True):
+    """
+    Tải snapshot chấm điểm dựng sẵn (snapshot.npz, xem snapshot.ScoringSnapshot): chỉ cần NumPy,
+    không import pandas/sklearn. Dùng snapshot.predict_single(row) / predict_rows(rows).
+    """
+    if not use_cache:
+        return ScoringSnapshot.load(filepath)
+    return get_artifact(filepath, ScoringSnapshot.load)
+
+def load_forest_scorer(filepath, model=None, use_cache=True):
+    """
+    Tải bảng node phẳng (forest_scorer.npz). Truyền model sklearn gốc để các khối lớn
+    được chuyển cho sklearn (xem forest_scorer.FlatForest).
+    """
+    scorer = FlatForest.load(filepath) if not use_cache else get_artifact(filepath, FlatForest.load)
+    if model is not None:
+        # Bản sao nông để không sửa object dùng chung trong cache
+        scorer = copy.copy(scorer)
+        scorer.model = model
+    return scorer
+
+def _get_transform(scaler_path, preprocessor_path):
+    """Hàm biến đổi dữ liệu thô -> ma trận đã chuẩn hóa cho predict_batch/score_csv"""
+    if preprocessor_path is not None:
+        return load_preprocessor(preprocessor_path).transform
+    scaler = load_scaler(scaler_path)
+    encode_features = _preprocessing().encode_features
+    # Median TotalCharges lúc train: lưu trong scaler.pkl (bản mới) hoặc preprocessor.pkl cùng thư mục
+    fill = getattr(scaler, "total_charges_median_", None)
+    sibling = os.path.join(os.path.dirname(scaler_path), "preprocessor.pkl")
+    if fill is None and os.path.exists(sibling):
+        fill = load_preprocessor(sibling).total_charges_median_
+    return lambda chunk: scaler.transform(encode_features(chunk, fill))
+
+def predict_single(model, input_dict, scaler_path="../models/scaler.pkl", preprocessor_path=None,
+                   cache=None):
     """
     Dự đoán cho 1 khách hàng từ dictionary đầu vào.
     Hàm này tự động load scaler để chuẩn hóa dữ liệu giống hệt lúc train.
+    Nếu truyền preprocessor_path, input_dict là dữ liệu thô (text như 'Male', 'Yes')
+    và được mã hóa + chuẩn hóa bằng preprocessor.pkl đã lưu lúc train.
+    cache: PredictionCache (vd. result_cache) để dùng lại kết quả của hồ sơ đã chấm,
+    chỉ áp dụng khi có preprocessor_path.
     """
-    # 1. Chuyển dictionary thành DataFrame
-    df_in = pd.DataFrame([input_dict])
-    
-    # 2. Xử lý dữ liệu (Cần đảm bảo logic giống hệt preprocess lúc train)
-    # Lưu ý: Để đơn giản cho demo, ta giả định input đã được encode số (như 'Gender_Male': 1)
-    # Nếu input là text ('Male'), cần thêm bước map/encode ở đây.
-    
-    # 3. Load Scaler và chuẩn hóa
-    try:
-        scaler = joblib.load(scaler_path)
-        # Đảm bảo thứ tự cột khớp với scaler. Nếu input_dict thiếu cột, code sẽ lỗi,
-        # vì vậy cần đảm bảo input_dict đủ các feature như lúc train.
-        data_scaled = scaler.transform(df_in)
-    except FileNotFoundError:
-        print("Cảnh báo: Không tìm thấy scaler.pkl, sử dụng dữ liệu thô.")
-        data_scaled = df_in
-    except Exception as e:
-        print(f"Lỗi khi scale dữ liệu: {e}")
-        data_scaled = df_in
-
-    # 4. Dự đoán
-    prediction = model.predict(data_scaled)[0]
-    probability = model.predict_proba(data_scaled)[0][1]
+    with stage("predict_single", rows=1):
+        return _predict_single(model, input_dict, scaler_path, preprocessor_path, cache)
+
+def _predict_single(model, input_dict, scaler_path, preprocessor_path, cache=None):
+    if preprocessor_path is not None:
+        preprocessor = load_preprocessor(preprocessor_path)
+        row = preprocessor.encode_row(input_dict)
+        # Phiên bản = object model + preprocessor hiện tại (đổi khi artifact được load lại)
+        version = (model, preprocessor)
+        if cache is not None:
+            result = cache.get(row, version)
+            if result is not None:
+                return dict(result)
+
+        proba = model.predict_proba(preprocessor.scale_row(row))[0]
+        result = {
+            "prediction": int(model.classes_[np.argmax(proba)]),
+            "probability": float(proba[1])
+        }
+        if cache is not None:
+            cache.put(row, dict(result), version)
+        return result
+
+    import pandas as pd
+
+    # Dữ liệu sai/thiếu cột hoặc thiếu scaler.pkl thì báo lỗi (ValueError/FileNotFoundError),
+    # không dự đoán trên dữ liệu thô chưa chuẩn hóa
+    df_in, _ = _validation().validate_batch(pd.DataFrame([input_dict]))
+    proba = model.predict_proba(_get_transform(scaler_path, None)(df_in))[0]
+    return {
+        "prediction": int(model.classes_[np.argmax(proba)]),
+        "probability": float(proba[1])
+    }
+
+def _iter_chunks(data, chunk_size):
+    """Chia dữ liệu đầu vào (DataFrame, ma trận NumPy hoặc đường dẫn CSV) thành các khối DataFrame."""
+    import pandas as pd
+    if isinstance(data, (str, os.PathLike)):
+        # Đọc CSV theo từng khối để không phải nạp cả file vào bộ nhớ
+        for chunk in pd.read_csv(data, chunksize=chunk_size):
+            yield chunk
+    elif isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        arr = np.asarray(data)
+        if arr.ndim != 2 or arr.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Ma trận đầu vào phải có dạng (n, {len(FEATURE_COLUMNS)})")
+        for start in range(0, len(arr), chunk_size):
+            yield pd.DataFrame(arr[start:start + chunk_size], columns=FEATURE_COLUMNS)
+
+def _valid_mask(report, n_rows):
+    """Mảng bool các dòng hợp lệ của khối, None nếu cả khối hợp lệ"""
+    if not report["invalid_rows"]:
+        return None
+    keep = np.ones(n_rows, dtype=bool)
+    keep[report["invalid_positions"]] = False
+    return keep
+
+def _fill(values, keep, fill_value):
+    """Đặt kết quả của các dòng hợp lệ về đúng vị trí trong khối, dòng bị cách ly = fill_value"""
+    if keep is None:
+        return values
+    out = np.full(len(keep), fill_value, dtype=np.result_type(values, np.asarray(fill_value)))
+    out[keep] = values
+    return out
+
+def _score_chunk(model, transform, chunk, on_error="raise"):
+    """
+    Kiểm tra + encode + scale + dự đoán một khối. Trả về (nhãn, xác suất churn, report kiểm tra).
+    on_error: xem validation.validate_batch; với "quarantine" dòng lỗi có nhãn -1, xác suất NaN.
+    """
+    with stage("batch.validate", rows=len(chunk)):
+        valid, report = _validation().validate_batch(chunk, on_error)
+    keep = _valid_mask(report, len(chunk)) if on_error == "quarantine" else None
+    if len(valid) == 0:
+        return np.full(len(chunk), -1), np.full(len(chunk), np.nan), report
+    with stage("batch.transform", rows=len(valid)):
+        X_scaled = transform(valid)
+    # predict_proba một lần, nhãn suy ra từ xác suất (tránh gọi model.predict lần nữa)
+    with stage("batch.predict_proba", rows=len(valid)):
+        proba = model.predict_proba(X_scaled)
+    pred = model.classes_[np.argmax(proba, axis=1)].astype(int)
+    return _fill(pred, keep, -1), _fill(proba[:, 1], keep, np.nan), report
+
+def predict_batch(model, data, scaler_path="../models/scaler.pkl", chunk_size=10000,
+                  preprocessor_path=None, on_error="raise"):
+    """
+    Dự đoán cho nhiều khách hàng cùng lúc.
+    `data` có thể là DataFrame, ma trận NumPy (đã encode, đúng thứ tự FEATURE_COLUMNS)
+    hoặc đường dẫn CSV theo schema data/customer_churn.csv.
+    Scaler chỉ load một lần, mỗi khối gọi scaler và model đúng một lần.
+    Nếu có preprocessor_path thì dùng preprocessor.pkl thay cho bảng mã mặc định + scaler.
+    Mỗi khối được kiểm tra schema trước khi chấm điểm (validation.validate_batch):
+    on_error="raise" báo ValidationError, "quarantine" giữ nguyên thứ tự với nhãn -1 /
+    xác suất NaN cho dòng lỗi. Report gộp nằm ở kết quả["validation"].
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size phải lớn hơn 0")
+
+    transform = _get_transform(scaler_path, preprocessor_path)
+
+    predictions = []
+    probabilities = []
+    reports = []
+    with stage("predict_batch") as info:
+        for chunk in _iter_chunks(data, chunk_size):
+            if len(chunk) == 0:
+                continue
+            pred, prob, report = _score_chunk(model, transform, chunk, on_error)
+            predictions.append(pred)
+            probabilities.append(prob)
+            reports.append(report)
+        info["rows"] = sum(len(p) for p in predictions)
+
+    if not predictions:
+        return {"prediction": np.empty(0, dtype=int), "probability": np.empty(0), "validation": None}
 
     return {
-        "prediction": int(prediction),
-        "probability": float(probability)
-    }
\ No newline at end of file
+        "prediction": np.concatenate(predictions),
+        "probability": np.concatenate(probabilities),
+        "validation": _validation().merge_reports(reports)
+    }
+
+def score_csv(model, input_path, output_path, scaler_path, chunk_size=10000,
+              preprocessor_path=None, explain_top=0, on_error="raise", quarantine_path=None):
+    """
+    Chấm điểm file CSV đầu vào và ghi kết quả ra file CSV theo từng khối.
+    explain_top=k > 0: thêm k cột reason_i / contribution_i (đặc trưng ảnh hưởng mạnh nhất).
+    on_error="quarantine": dòng lỗi có nhãn -1 / xác suất NaN và được ghi kèm lý do (_errors)
+    ra quarantine_path (nếu có). Cuối cùng in tóm tắt kiểm tra nếu có dòng lỗi/bị ép kiểu.
+    """
+    import pandas as pd
+    validation = _validation()
+
+    transform = _get_transform(scaler_path, preprocessor_path)
+    n_rows = 0
+    n_quarantined = 0
+    reports = []
+    for i, chunk in enumerate(_iter_chunks(input_path, chunk_size)):
+        if explain_top:
+            # Dùng chung ma trận đã chuẩn hóa cho dự đoán và giải thích
+            valid, report = validation.validate_batch(chunk, on_error)
+            keep = _valid_mask(report, len(chunk)) if on_error == "quarantine" else None
+            if len(valid) == 0:
+                # Cả khối bị cách ly: giữ đủ cột, mọi dòng là -1 / NaN
+                X_scaled = np.empty((0, len(FEATURE_COLUMNS)))
+                proba = np.empty((0, 2))
+            else:
+                X_scaled = transform(valid)
+                proba = model.predict_proba(X_scaled)
+            pred = _fill(model.classes_[np.argmax(proba, axis=1)].astype(int), keep, -1)
+            prob = _fill(proba[:, 1], keep, np.nan)
+        else:
+            pred, prob, report = _score_chunk(model, transform, chunk, on_error)
+        reports.append(report)
+
+        out = pd.DataFrame(index=chunk.index)
+        if "customerID" in chunk.columns:
+            out["customerID"] = chunk["customerID"]
+        out["prediction"] = pred
+        out["probability"] = prob
+        if explain_top:
+            contrib = explain(model, X_scaled)[0] if len(X_scaled) else X_scaled
+            idx, values = top_factors(contrib, explain_top)
+            names = np.asarray(FEATURE_COLUMNS, dtype=object)[idx]
+            for k in range(idx.shape[1]):
+                out[f"reason_{k + 1}"] = _fill(names[:, k], keep, "")
+                out[f"contribution_{k + 1}"] = _fill(values[:, k], keep, np.nan)
+
+        out.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        if quarantine_path is not None and report.get("quarantine") is not None:
+            report["quarantine"].to_csv(quarantine_path, mode='w' if n_quarantined == 0 else 'a',
+                                        header=(n_quarantined == 0), index=False)
+            n_quarantined += len(report["quarantine"])
+        n_rows += len(chunk)
+
+    merged = validation.merge_reports(reports)
+    if merged is not None and (merged["invalid_rows"] or merged["total_charges_coerced"]):
+        print(f"Kiểm tra dữ liệu: {validation.format_report(merged)}")
+    return n_rows
+
+# =============================================================================
+# Giải thích dự đoán: đóng góp của từng đặc trưng, vectorized cho cả lô
+# =============================================================================
+
+# Bảng đóng góp theo lá cho từng model cây, tính một lần cho mỗi object model
+_tree_tables = weakref.WeakKeyDictionary()
+
+def _tree_contribution_table(model):
+    """
+    Phân rã Saabas: đi từ node cha xuống node con làm xác suất churn đổi
+    value(con) - value(cha), phần thay đổi này thuộc về đặc trưng mà node cha dùng để tách.
+    Tổng dọc đường đi tới mỗi lá chỉ phụ thuộc vào lá, nên được tính sẵn một lần.
+    Trả về (offset node của từng cây, chỉ số lá theo node, bảng (số lá, n_features), giá trị gốc).
+    """
+    table = _tree_tables.get(model)
+    if table is not None:
+        return table
+
+    estimators = getattr(model, "estimators_", [model])
+    n_features = model.n_features_in_
+    offsets = np.cumsum([0] + [est.tree_.node_count for est in estimators])
+    left = np.concatenate([est.tree_.children_left for est in estimators])
+    right = np.concatenate([est.tree_.children_right for est in estimators])
+    feature = np.concatenate([est.tree_.feature for est in estimators])
+    p = np.concatenate([est.tree_.value[:, 0, 1] / est.tree_.value[:, 0, :].sum(axis=1)
+                        for est in estimators])
+    is_split = left != -1
+    shift = np.where(is_split, np.repeat(offsets[:-1], np.diff(offsets)), 0)
+    left, right = left + shift, right + shift
+
+    # Duyệt đồng thời mọi cây theo từng tầng: đóng góp của con = của cha + thay đổi tại node cha
+    contrib = np.zeros((offsets[-1], n_features))
+    frontier = offsets[:-1]
+    while frontier.size:
+        frontier = frontier[is_split[frontier]]
+        for child in (left[frontier], right[frontier]):
+            contrib[child] = contrib[frontier]
+            contrib[child, feature[frontier]] += p[child] - p[frontier]
+        frontier = np.concatenate([left[frontier], right[frontier]])
+
+    n_trees = len(estimators)
+    leaf_row = np.cumsum(~is_split) - 1
+    table = (offsets[:-1], leaf_row, contrib[~is_split] / n_trees, float(p[offsets[:-1]].mean()))
+    _tree_tables[model] = table
+    return table
+
+def explain(model, X_scaled, block_size=10000):
+    """
+    Đóng góp của từng đặc trưng cho từng dòng (ma trận đã chuẩn hóa, shape (n, n_features)).
+    Trả về (contributions (n, n_features), base) với base + tổng mỗi dòng bằng đúng:
+        - Logistic Regression: log-odds (coef_j * x_j; x đã chuẩn hóa nên mốc là trung bình tập train)
+        - Decision Tree / Random Forest: xác suất churn (phân rã theo đường đi trên cây)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
+    X_scaled = np.asarray(X_scaled, dtype=np.float64)
+    if X_scaled.ndim == 1:
+        X_scaled = X_scaled.reshape(1, -1)
+    if len(getattr(model, "classes_", ())) != 2:
+        raise ValueError("Chỉ hỗ trợ phân loại nhị phân")
+
+    if isinstance(model, LogisticRegression):
+        coef = np.ravel(model.coef_)
+        return X_scaled * coef, float(model.intercept_[0])
+
+    if isinstance(model, (RandomForestClassifier, DecisionTreeClassifier)):
+        offsets, leaf_row, table, base = _tree_contribution_table(model)
+        contrib = np.zeros((len(X_scaled), table.shape[1]))
+        for start in range(0, len(X_scaled), block_size):
+            # Lá của từng (dòng, cây) -> cộng dòng tương ứng trong bảng, lần lượt từng cây
+            leaves = model.apply(X_scaled[start:start + block_size]).reshape(-1, len(offsets))
+            rows = leaf_row[leaves + offsets]
+            block = contrib[start:start + block_size]
+            for t in range(rows.shape[1]):
+                block += table[rows[:, t]]
+        return contrib, base
+
+    raise ValueError(f"Chưa hỗ trợ giải thích cho {type(model).__name__}")
+
+def top_factors(contributions, k=3):
+    """
+    k đặc trưng có |đóng góp| lớn nhất của mỗi dòng (vectorized).
+    Trả về (chỉ số cột (n, k), giá trị đóng góp (n, k)) sắp xếp giảm dần theo |đóng góp|.
+    """
+    contributions = np.asarray(contributions)
+    k = min(k, contributions.shape[1])
+    order = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(contributions, order, axis=1)
+
+def explain_batch(model, data, scaler_path="../models/scaler.pkl", chunk_size=10000,
+                  preprocessor_path=None):
+    """
+    Giống predict_batch nhưng trả về giải thích:
+    {"features", "base", "contributions" (n, n_features)}.
+    """
+    transform = _get_transform(scaler_path, preprocessor_path)
+    parts = []
+    base = None
+    with stage("explain_batch") as info:
+        for chunk in _iter_chunks(data, chunk_size):
+            if len(chunk) == 0:
+                continue
+            contrib, base = explain(model, transform(chunk))
+            parts.append(contrib)
+        info["rows"] = sum(len(p) for p in parts)
+    contributions = np.vstack(parts) if parts else np.empty((0, len(FEATURE_COLUMNS)))
+    return {"features": list(FEATURE_COLUMNS), "base": base, "contributions": contributions}
+
+def explain_single(model, input_dict, preprocessor_path, k=5):
+    """
+    Giải thích dự đoán cho 1 khách hàng (dữ liệu thô).
+    Trả về k đặc trưng ảnh hưởng mạnh nhất: [{"feature", "value", "contribution"}],
+    contribution > 0 là làm tăng nguy cơ churn.
+    """
+    with stage("explain_single", rows=1):
+        X_scaled = load_preprocessor(preprocessor_path).transform(input_dict)
+        contrib, _ = explain(model, X_scaled)
+        idx, values = top_factors(contrib, k)
+        return [{"feature": FEATURE_COLUMNS[j], "value": input_dict.get(FEATURE_COLUMNS[j]),
+                 "contribution": float(v)}
+                for j, v in zip(idx[0], values[0])]
+
+def main(argv=None):
+    """CLI: python -m src.predict score in.csv out.csv"""
+    parser = argparse.ArgumentParser(description="Dự đoán churn cho file CSV khách hàng")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    score = sub.add_parser("score", help="Chấm điểm toàn bộ file CSV")
+    score.add_argument("input", help="File CSV đầu vào (schema customer_churn.csv)")
+    score.add_argument("output", help="File CSV kết quả")
+    score.add_argument("--model", default=os.path.join(MODELS_DIR, "model.pkl"))
+    score.add_argument("--scaler", default=os.path.join(MODELS_DIR, "scaler.pkl"))
+    score.add_argument("--preprocessor", default=os.path.join(MODELS_DIR, "preprocessor.pkl"),
+                       help="preprocessor.pkl (bỏ qua nếu file không tồn tại)")
+    score.add_argument("--chunk-size", type=int, default=10000)
+    score.add_argument("--explain", type=int, default=0, metavar="K",
+                       help="Thêm K đặc trưng ảnh hưởng mạnh nhất cho mỗi dòng")
+    score.add_argument("--on-error", choices=["raise", "quarantine"], default="raise",
+                       help="Dòng sai schema: dừng lại (raise) hoặc cách ly và chấm tiếp (quarantine)")
+    score.add_argument("--quarantine", help="File CSV ghi các dòng bị cách ly kèm lý do")
+
+
+    export = sub.add_parser("export-linear",
+                            help="Xuất Logistic Regression thành bộ chấm điểm thuần NumPy (.npz)")
+    export.add_argument("--model", default=os.path.join(MODELS_DIR, "model.pkl"))
+    export.add_argument("--preprocessor", default=os.path.join(MODELS_DIR, "preprocessor.pkl"))
+    export.add_argument("--output", default=os.path.join(MODELS_DIR, "linear_scorer.npz"))
+
+    export_forest = sub.add_parser("export-forest",
+                                   help="Xuất Random Forest/Decision Tree thành bảng node phẳng (.npz)")
+    export_forest.add_argument("--model", default=os.path.join(MODELS_DIR, "model.pkl"))
+    export_forest.add_argument("--output", default=os.path.join(MODELS_DIR, "forest_scorer.npz"))
+
+    export_snapshot = sub.add_parser("export-snapshot",
+                                     help="Xuất snapshot chấm điểm thuần NumPy (.npz) cho LR/RF/DT")
+    export_snapshot.add_argument("--model", default=os.path.join(MODELS_DIR, "model.pkl"))
+    export_snapshot.add_argument("--preprocessor", default=os.path.join(MODELS_DIR, "preprocessor.pkl"))
+    export_snapshot.add_argument("--output", default=os.path.join(MODELS_DIR, "snapshot.npz"))
+
+    args = parser.parse_args(argv)
+
+    if args.command == "score":
+        model = load_model(args.model)
+        preprocessor = args.preprocessor if os.path.exists(args.preprocessor) else None
+        n_rows = score_csv(model, args.input, args.output, args.scaler,
+                           chunk_size=args.chunk_size, preprocessor_path=preprocessor,
+                           explain_top=args.explain, on_error=args.on_error,
+                           quarantine_path=args.quarantine)
+        print(f"Đã chấm điểm {n_rows} khách hàng, kết quả lưu tại: {args.output}")
+    elif args.command == "export-linear":
+        scorer = export_linear_scorer(load_model(args.model), load_preprocessor(args.preprocessor))
+        scorer.save(args.output)
+        print(f"Đã lưu bộ chấm điểm tại: {args.output}")
+    elif args.command == "export-forest":
+        FlatForest.from_sklearn(load_model(args.model), keep_model=False).save(args.output)
+        print(f"Đã lưu bảng node tại: {args.output}")
+    elif args.command == "export-snapshot":
+        snapshot = ScoringSnapshot.from_model(load_model(args.model), load_preprocessor(args.preprocessor))
+        snapshot.save(args.output)
+        print(f"Đã lưu snapshot tại: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,56 +1,370 @@
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
+import os
+import json
+import shutil
+import hashlib
 import joblib
 
+try:
+    from src.artifacts import file_hash
+    from src.instrumentation import stage
+    from src.schema import FEATURE_COLUMNS, CATEGORY_LEVELS, NUMERIC_RANGES, encode_record
+    from src.validation import validate_batch, format_report
+except ImportError:
+    from artifacts import file_hash
+    from instrumentation import stage
+    from schema import FEATURE_COLUMNS, CATEGORY_LEVELS, NUMERIC_RANGES, encode_record
+    from validation import validate_batch, format_report
+
 def load_data(filepath):
     """Đọc dữ liệu từ file CSV"""
-    df = pd.read_csv(filepath)
+    with stage("load_data") as info:
+        df = pd.read_csv(filepath)
+        info["rows"] = len(df)
     return df
 
-def preprocess(df, save_artifacts_path="../models/"):
+def _encode(df, categories, total_charges_fill=None):
+    """Mã hóa vectorized theo bảng categories, trả về DataFrame đúng thứ tự FEATURE_COLUMNS."""
+    out = pd.DataFrame(index=df.index)
+    for col in FEATURE_COLUMNS:
+        values = df[col]
+        if col in categories and not pd.api.types.is_numeric_dtype(values):
+            codes = pd.Categorical(values, categories=categories[col]).codes
+            if (codes < 0).any():
+                unknown = sorted(set(values[codes < 0].astype(str)))
+                raise ValueError(f"Giá trị không hợp lệ ở cột '{col}': {unknown}")
+            out[col] = codes.astype('int64')
+        else:
+            out[col] = pd.to_numeric(values, errors='coerce')
+    # TotalCharges rỗng (khách mới) được điền median lúc train, không dùng thống kê của khối
+    missing = out['TotalCharges'].isna()
+    if missing.any():
+        if total_charges_fill is None:
+            raise ValueError("TotalCharges trống nhưng không có median lúc train "
+                             "(cần preprocessor.pkl hoặc scaler.pkl có total_charges_median_)")
+        out['TotalCharges'] = out['TotalCharges'].fillna(total_charges_fill)
+    return out
+
+def encode_features(df, total_charges_fill=None):
     """
-    Làm sạch dữ liệu, mã hóa và chia tập train/test.
-    Lưu lại scaler và encoder để dùng cho lúc dự đoán sau này.
-    """
-    df_clean = df.copy()
-
-    # 1. Xử lý cột customerID (nếu có)
-    if "customerID" in df_clean.columns:
-        df_clean.drop("customerID", axis=1, inplace=True)
-
-    # 2. Xử lý cột TotalCharges (chuyển sang số và điền median)
-    df_clean['TotalCharges'] = pd.to_numeric(df_clean['TotalCharges'], errors='coerce')
-    df_clean['TotalCharges'].fillna(df_clean['TotalCharges'].median(), inplace=True)
-
-    # 3. Mã hóa biến phân loại (Label Encoding)
-    # Lưu ý: Cần lưu lại encoder/mapping để dùng cho lúc dự đoán
-    cat_cols = df_clean.select_dtypes(include=["object"]).columns
-    encoders = {}
-    
-    for col in cat_cols:
-        le = LabelEncoder()
-        df_clean[col] = le.fit_transform(df_clean[col])
-        encoders[col] = le
-    
-    # Lưu encoders (tùy chọn, để đơn giản ta bỏ qua bước save encoders trong demo này
-    # nhưng thực tế cần lưu lại để map ngược)
+    Chuyển DataFrame thô (schema customer_churn.csv) thành ma trận số
+    theo đúng thứ tự FEATURE_COLUMNS. Cột đã là số thì giữ nguyên.
+    total_charges_fill: median TotalCharges lúc train, dùng cho ô trống.
+    """
+    return _encode(df, CATEGORY_LEVELS, total_charges_fill)
+
+class ChurnPreprocessor:
+    """
+    Bộ tiền xử lý đã fit: làm sạch + mã hóa biến phân loại + chuẩn hóa.
+    Lưu cùng thư mục với model (preprocessor.pkl) để lúc dự đoán dùng đúng
+    mapping và thống kê như lúc train, áp dụng trực tiếp lên dữ liệu thô.
+    """
+
+    def __init__(self):
+        self.categories_ = None       # {cột: [giá trị sắp xếp A-Z]}, index = mã
+        self.codes_ = None            # {cột: {giá trị: mã}} tra cứu nhanh cho từng dòng
+        self.total_charges_median_ = None
+        self.scaler_ = None
+
+    def fit_encoding(self, df):
+        """Học bảng mã hóa và median TotalCharges từ dữ liệu thô"""
+        self.categories_ = {
+            col: sorted(df[col].dropna().astype(str).unique())
+            for col in FEATURE_COLUMNS
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col])
+            and col != 'TotalCharges'
+        }
+        self.codes_ = {
+            col: {value: code for code, value in enumerate(levels)}
+            for col, levels in self.categories_.items()
+        }
+        self.total_charges_median_ = float(
+            pd.to_numeric(df['TotalCharges'], errors='coerce').median()
+        )
+        return self
+
+    def encode(self, df):
+        """Dữ liệu thô -> DataFrame số (chưa chuẩn hóa)"""
+        if isinstance(df, dict):
+            df = pd.DataFrame([df])
+        return _encode(df, self.categories_, self.total_charges_median_)
+
+    def encode_row(self, row):
+        """
+        Mã hóa một khách hàng (dict) bằng bảng tra cứu, không qua pandas (schema.encode_record).
+        Thiếu cột hoặc giá trị sai (như validate_batch) -> ValueError.
+        """
+        return np.array(encode_record(row, FEATURE_COLUMNS, self.codes_, self.total_charges_median_))
+
+    def fit_scaler(self, X_encoded):
+        """Fit StandardScaler trên dữ liệu đã mã hóa (thường là tập train)"""
+        self.scaler_ = StandardScaler().fit(X_encoded)
+        # Lưu kèm median vào scaler.pkl cho đường dự đoán chỉ dùng scaler
+        self.scaler_.total_charges_median_ = self.total_charges_median_
+        return self
+
+    def fit(self, df):
+        """Fit cả mã hóa lẫn scaler trên cùng một tập dữ liệu"""
+        self.fit_encoding(df)
+        return self.fit_scaler(self.encode(df))
+
+    def scale_row(self, row):
+        """Chuẩn hóa một dòng đã mã hóa (kết quả encode_row): (x - mean) / scale, shape (1, n)"""
+        return ((row - self.scaler_.mean_) / self.scaler_.scale_).reshape(1, -1)
+
+    def transform(self, df):
+        """Dữ liệu thô (DataFrame hoặc dict) -> ma trận đã chuẩn hóa, một lần gọi vectorized"""
+        if isinstance(df, dict):
+            # Một dòng: tra bảng mã rồi chuẩn hóa trực tiếp, không qua pandas
+            return self.scale_row(self.encode_row(df))
+        return self.scaler_.transform(self.encode(df))
+
+    def save(self, filepath):
+        """Lưu preprocessor (joblib)"""
+        joblib.dump(self, filepath)
+
+    @staticmethod
+    def load(filepath):
+        """Đọc preprocessor đã lưu"""
+        return joblib.load(filepath)
+
+def _encode_dataset(df):
+    """Làm sạch + mã hóa toàn bộ dữ liệu. Trả về (preprocessor chưa fit scaler, X, y)."""
+    # 1-3. Làm sạch (bỏ customerID, TotalCharges -> số + median) và mã hóa biến phân loại.
+    # Bảng mã hóa được giữ lại trong ChurnPreprocessor thay vì bỏ đi sau khi fit.
+    # Kiểm tra schema trước (chỉ báo cáo): số dòng TotalCharges bị ép kiểu thành NaN rồi điền median
+    _, report = validate_batch(df, on_error="report")
+    print(f"Kiểm tra dữ liệu: {format_report(report)}")
+    preprocessor = ChurnPreprocessor().fit_encoding(df)
+    X = preprocessor.encode(df)
 
     # 4. Tách X, y
-    X = df_clean.drop("Churn", axis=1)
-    y = df_clean["Churn"]
+    y = pd.Series(LabelEncoder().fit_transform(df["Churn"]), index=df.index, name="Churn")
+    return preprocessor, X, y
 
+def _split_and_scale(preprocessor, X, y, save_artifacts_path):
+    """Chia train/test, fit scaler trên tập train và lưu scaler + preprocessor"""
     # 5. Chia train/test
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, stratify=y
     )
 
     # 6. Scaling (Chuẩn hóa)
-    scaler = StandardScaler()
-    X_train_s = scaler.fit_transform(X_train)
+    preprocessor.fit_scaler(X_train)
+    scaler = preprocessor.scaler_
+    X_train_s = scaler.transform(X_train)
     X_test_s = scaler.transform(X_test)
 
-    # Lưu scaler để dùng cho app dự đoán sau này
-    joblib.dump(scaler, f"{save_artifacts_path}scaler.pkl")
+    # Lưu scaler và preprocessor để dùng cho app dự đoán sau này (None: không lưu)
+    if save_artifacts_path is not None:
+        joblib.dump(scaler, f"{save_artifacts_path}scaler.pkl")
+        preprocessor.save(f"{save_artifacts_path}preprocessor.pkl")
+
+    return X_train_s, X_test_s, y_train, y_test, X.columns
+
+def preprocess(df, save_artifacts_path="../models/"):
+    """
+    Làm sạch dữ liệu, mã hóa và chia tập train/test.
+    Lưu lại scaler và bộ tiền xử lý (preprocessor.pkl) để dùng cho lúc dự đoán sau này.
+    """
+    with stage("preprocess", rows=len(df)):
+        preprocessor, X, y = _encode_dataset(df)
+        return _split_and_scale(preprocessor, X, y, save_artifacts_path)
+
+# =============================================================================
+# Cache nhị phân (.npy, memory-map) cho dữ liệu đã làm sạch + mã hóa
+# =============================================================================
+
+# Tăng số này khi thay đổi logic làm sạch/mã hóa để vô hiệu hóa cache cũ
+CACHE_VERSION = 1
+
+def _cache_key(filepath):
+    """Khóa cache: SHA-256 nội dung CSV + cấu hình tiền xử lý"""
+    config = {"version": CACHE_VERSION, "features": FEATURE_COLUMNS}
+    h = hashlib.sha256(file_hash(filepath).encode())
+    h.update(json.dumps(config, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+def load_encoded_cached(filepath, cache_dir="../data/cache/"):
+    """
+    Đọc CSV đã làm sạch + mã hóa, có cache trên đĩa.
+    Lần đầu: parse CSV, mã hóa và ghi X.npy / y.npy / encoder.pkl vào cache_dir/<khóa>/.
+    Các lần sau (cùng nội dung CSV và cấu hình): memory-map X, y trực tiếp, không parse lại.
+    Trả về (preprocessor chưa fit scaler, X DataFrame, y Series).
+    """
+    entry = os.path.join(cache_dir, _cache_key(filepath))
+    x_path = os.path.join(entry, "X.npy")
+    y_path = os.path.join(entry, "y.npy")
+    enc_path = os.path.join(entry, "encoder.pkl")
+
+    if os.path.exists(x_path) and os.path.exists(y_path) and os.path.exists(enc_path):
+        # Zero-copy: mảng được map từ file, DataFrame dùng chung bộ nhớ với mmap
+        X = pd.DataFrame(np.load(x_path, mmap_mode='r'), columns=FEATURE_COLUMNS, copy=False)
+        y = pd.Series(np.load(y_path, mmap_mode='r'), name="Churn", copy=False)
+        return ChurnPreprocessor.load(enc_path), X, y
+
+    preprocessor, X, y = _encode_dataset(load_data(filepath))
+
+    # Ghi vào thư mục tạm rồi đổi tên để không để lại cache dở dang khi bị ngắt
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = entry + f".tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "X.npy"), X.to_numpy(dtype=np.float64))
+    np.save(os.path.join(tmp, "y.npy"), y.to_numpy())
+    preprocessor.save(os.path.join(tmp, "encoder.pkl"))
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        # Tiến trình khác đã ghi xong cùng khóa
+        shutil.rmtree(tmp, ignore_errors=True)
+    return preprocessor, X.reset_index(drop=True), y.reset_index(drop=True)
+
+def preprocess_file(filepath, save_artifacts_path="../models/", cache_dir="../data/cache/"):
+    """Giống preprocess nhưng đọc thẳng từ file CSV, dùng cache nhị phân nếu có"""
+    preprocessor, X, y = load_encoded_cached(filepath, cache_dir)
+    return _split_and_scale(preprocessor, X, y, save_artifacts_path)
+
+# =============================================================================
+# Xử lý theo luồng (streaming) cho file CSV lớn hơn bộ nhớ
+# =============================================================================
+
+def csv_dtypes():
+    """Kiểu dữ liệu gọn cho read_csv: biến phân loại -> category, số tiền -> float32"""
+    dtypes = {col: pd.CategoricalDtype(levels) for col, levels in CATEGORY_LEVELS.items()}
+    dtypes.update({
+        'customerID': 'string',
+        'SeniorCitizen': 'int8',
+        'tenure': 'int16',
+        'MonthlyCharges': 'float32',
+        'TotalCharges': 'float32',
+        'Churn': pd.CategoricalDtype(['No', 'Yes']),
+    })
+    return dtypes
+
+def read_csv_chunks(filepath, chunksize=100000, usecols=None):
+    """
+    Đọc CSV theo từng khối với dtype gọn.
+    Biến phân loại trả về dạng mã int8 (thứ tự A-Z giống LabelEncoder), -1 nếu giá trị lạ.
+    TotalCharges rỗng (' ') được đọc thành NaN.
+    """
+    reader = pd.read_csv(filepath, chunksize=chunksize, usecols=usecols,
+                         dtype=csv_dtypes(), na_values={'TotalCharges': [' ', '']})
+    for chunk in reader:
+        for col in chunk.columns:
+            if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                chunk[col] = chunk[col].cat.codes.astype('int8')
+        yield chunk
+
+def _merge_counts(keys, counts, values):
+    """Cộng số lần xuất hiện của `values` vào histogram thưa (keys tăng dần, counts)"""
+    new_keys, new_counts = np.unique(values, return_counts=True)
+    keys, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([counts, new_counts]),
+                         minlength=len(keys)).astype(np.int64)
+    return keys, counts
+
+def _median_from_counts(keys, counts, resolution):
+    """Median từ histogram thưa: keys = giá trị / resolution (đã làm tròn), counts = số lần"""
+    cum = np.cumsum(counts)
+    total = cum[-1]
+    lo = keys[np.searchsorted(cum, (total - 1) // 2 + 1)]
+    hi = keys[np.searchsorted(cum, total // 2 + 1)]
+    return (lo + hi) / 2 * resolution
+
+def _check_streaming_chunk(chunk):
+    """
+    Kiểm tra một khối của read_csv_chunks: mã -1 (giá trị phân loại lạ hoặc trống),
+    số trống (trừ TotalCharges) hoặc ngoài NUMERIC_RANGES -> ValueError.
+    """
+    bad = [col for col in CATEGORY_LEVELS if col in chunk.columns and (chunk[col].to_numpy() < 0).any()]
+    if bad:
+        raise ValueError(f"Giá trị không hợp lệ ở cột {bad}")
+    for col, (lo, hi) in NUMERIC_RANGES.items():
+        values = chunk[col].to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        if col != 'TotalCharges' and missing.any():
+            raise ValueError(f"Thiếu giá trị ở cột '{col}'")
+        values = values[~missing]
+        out = values[(values < lo) | (values > hi)]
+        if len(out):
+            raise ValueError(f"Giá trị ngoài khoảng [{lo}, {hi}] ở cột '{col}': {out[:3].tolist()}")
+
+def fit_streaming(filepath, chunksize=100000, resolution=0.01):
+    """
+    Fit ChurnPreprocessor qua một lần đọc file theo khối.
+    - Median TotalCharges: histogram thưa đếm theo bước `resolution` (chính xác với dữ liệu tiền tệ
+      theo cent), bộ nhớ theo số giá trị khác nhau chứ không theo giá trị lớn nhất.
+    - Mã phân loại lạ (-1), số trống hoặc ngoài NUMERIC_RANGES -> ValueError trước khi fit.
+    - Mean/variance của scaler: StandardScaler.partial_fit (bỏ qua NaN), sau đó hiệu chỉnh
+      cột TotalCharges như thể các giá trị rỗng đã được điền median.
+    Khác với preprocess, thống kê được tính trên toàn bộ file (không tách train/test).
+    """
+    usecols = FEATURE_COLUMNS
+    scaler = StandardScaler()
+    keys = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    n_missing = 0
+
+    for chunk in read_csv_chunks(filepath, chunksize, usecols=usecols):
+        chunk = chunk[FEATURE_COLUMNS]
+        _check_streaming_chunk(chunk)
+        tc = chunk['TotalCharges'].to_numpy()
+        present = tc[~np.isnan(tc)]
+        n_missing += len(tc) - len(present)
+
+        bins = np.rint(present.astype(np.float64) / resolution).astype(np.int64)
+        keys, counts = _merge_counts(keys, counts, bins)
+
+        scaler.partial_fit(chunk)
+
+    if not len(keys):
+        raise ValueError("Không có giá trị TotalCharges hợp lệ để tính median")
+    median = float(_median_from_counts(keys, counts, resolution))
+
+    # Hiệu chỉnh mean/var của TotalCharges: thêm n_missing giá trị bằng median
+    i = FEATURE_COLUMNS.index('TotalCharges')
+    n_seen = np.broadcast_to(scaler.n_samples_seen_, (len(FEATURE_COLUMNS),)).astype(np.int64)
+    n, mean, var = n_seen[i], scaler.mean_[i], scaler.var_[i]
+    if n_missing:
+        new_n = n + n_missing
+        new_mean = (n * mean + n_missing * median) / new_n
+        new_var = (n * (var + (mean - new_mean) ** 2) + n_missing * (median - new_mean) ** 2) / new_n
+        scaler.mean_[i], scaler.var_[i] = new_mean, new_var
+        scaler.scale_[i] = np.sqrt(new_var) if new_var > 0 else 1.0
+        n_seen = n_seen.copy()
+        n_seen[i] = new_n
+    scaler.n_samples_seen_ = int(n_seen[0]) if (n_seen == n_seen[0]).all() else n_seen
+
+    preprocessor = ChurnPreprocessor()
+    preprocessor.categories_ = {col: list(levels) for col, levels in CATEGORY_LEVELS.items()}
+    preprocessor.codes_ = {
+        col: {value: code for code, value in enumerate(levels)}
+        for col, levels in preprocessor.categories_.items()
+    }
+    preprocessor.total_charges_median_ = median
+    preprocessor.scaler_ = scaler
+    return preprocessor
+
+def transform_streaming(filepath, preprocessor, chunksize=100000):
+    """
+    Sinh từng khối đã biến đổi: (X float32 đã chuẩn hóa, y int8 hoặc None, customerID hoặc None).
+    Chỉ giữ một khối trong bộ nhớ tại mỗi thời điểm.
+    """
+    scaler = preprocessor.scaler_
+    mean = scaler.mean_.astype(np.float32)
+    scale = scaler.scale_.astype(np.float32)
+    i = FEATURE_COLUMNS.index('TotalCharges')
+
+    for chunk in read_csv_chunks(filepath, chunksize):
+        _check_streaming_chunk(chunk)
+        X = chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+        np.nan_to_num(X[:, i], copy=False, nan=preprocessor.total_charges_median_)
+        X -= mean
+        X /= scale
 
-    return X_train_s, X_test_s, y_train, y_test, X.columns
\ No newline at end of file
+        y = chunk['Churn'].to_numpy() if 'Churn' in chunk.columns else None
+        ids = chunk['customerID'].to_numpy() if 'customerID' in chunk.columns else None
+        yield X, y, ids
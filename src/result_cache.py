@@ -0,0 +1,87 @@
+"""
+Cache kết quả dự đoán cho các hồ sơ khách hàng lặp lại (LRU + TTL, giới hạn kích thước).
+
+Khóa là vector đặc trưng đã mã hóa (chưa chuẩn hóa) ở dạng chuẩn (float64, -0.0 -> 0.0),
+gắn với phiên bản model hiện tại. Phiên bản là object bất kỳ so sánh được bằng ==;
+predict_single dùng cặp (model, preprocessor) lấy từ ArtifactRegistry - khi file model
+trên đĩa thay đổi, registry trả về object mới nên toàn bộ cache tự bị xóa.
+
+    from src.predict import predict_single, result_cache
+    predict_single(model, row, preprocessor_path=..., cache=result_cache)
+    result_cache.stats()   # {"hits", "misses", "size", "hit_rate", ...}
+"""
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class PredictionCache:
+    """Bộ nhớ đệm LRU có TTL cho kết quả dự đoán của từng vector đặc trưng"""
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(vector):
+        """Dạng chuẩn của vector đặc trưng đã mã hóa: bytes float64, bỏ dấu của số 0"""
+        return (np.asarray(vector, dtype=np.float64).ravel() + 0.0).tobytes()
+
+    def _check_version(self, version):
+        # Gọi khi đang giữ lock
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, vector, version=None):
+        """Kết quả đã lưu cho vector (cùng phiên bản model), None nếu chưa có hoặc hết hạn"""
+        key = self.key(vector)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, vector, value, version=None):
+        """Lưu kết quả; bỏ phần tử ít dùng nhất khi vượt maxsize"""
+        key = self.key(vector)
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Xóa toàn bộ kết quả (giữ nguyên bộ đếm)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Số lần trúng/trượt cache và kích thước hiện tại"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                    "maxsize": self.maxsize, "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+    def __len__(self):
+        return len(self._entries)
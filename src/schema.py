@@ -0,0 +1,97 @@
+"""
+Schema dữ liệu khách hàng dùng chung (không phụ thuộc pandas/sklearn): hằng số và bộ mã hóa
+một dòng (encode_record) dùng chung cho mọi đường chấm điểm từng khách hàng.
+"""
+import math
+
+# Thứ tự cột đặc trưng đúng như lúc train (X.columns sau khi bỏ customerID, Churn)
+FEATURE_COLUMNS = [
+    'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure',
+    'PhoneService', 'MultipleLines', 'InternetService', 'OnlineSecurity',
+    'OnlineBackup', 'DeviceProtection', 'TechSupport', 'StreamingTV',
+    'StreamingMovies', 'Contract', 'PaperlessBilling', 'PaymentMethod',
+    'MonthlyCharges', 'TotalCharges'
+]
+
+# Các giá trị của biến phân loại, sắp xếp A-Z giống thứ tự LabelEncoder gán mã
+CATEGORY_LEVELS = {
+    'gender': ['Female', 'Male'],
+    'Partner': ['No', 'Yes'],
+    'Dependents': ['No', 'Yes'],
+    'PhoneService': ['No', 'Yes'],
+    'MultipleLines': ['No', 'No phone service', 'Yes'],
+    'InternetService': ['DSL', 'Fiber optic', 'No'],
+    'OnlineSecurity': ['No', 'No internet service', 'Yes'],
+    'OnlineBackup': ['No', 'No internet service', 'Yes'],
+    'DeviceProtection': ['No', 'No internet service', 'Yes'],
+    'TechSupport': ['No', 'No internet service', 'Yes'],
+    'StreamingTV': ['No', 'No internet service', 'Yes'],
+    'StreamingMovies': ['No', 'No internet service', 'Yes'],
+    'Contract': ['Month-to-month', 'One year', 'Two year'],
+    'PaperlessBilling': ['No', 'Yes'],
+    'PaymentMethod': ['Bank transfer (automatic)', 'Credit card (automatic)',
+                      'Electronic check', 'Mailed check'],
+}
+
+# Khoảng giá trị hợp lệ của biến số (rộng, chỉ để bắt dữ liệu hỏng: số âm, nhầm đơn vị, ...)
+NUMERIC_RANGES = {
+    'SeniorCitizen': (0, 1),
+    'tenure': (0, 1000),
+    'MonthlyCharges': (0, 10000),
+    'TotalCharges': (0, 10000000),
+}
+
+# Biến số phải là số nguyên
+INTEGER_COLUMNS = ('SeniorCitizen', 'tenure')
+
+# Cột ngoài đặc trưng được phép có trong dữ liệu đầu vào
+ID_COLUMNS = ('customerID', 'Churn')
+
+def value_error(col, value, number, codes):
+    """
+    Loại lỗi của một giá trị đã đổi sang số (cùng quy tắc với validation.validate_batch),
+    None nếu hợp lệ. codes: {cột phân loại: {giá trị: mã}}.
+    """
+    if number != number:
+        # TotalCharges trống (khách mới) được điền median; chữ khác thì là lỗi
+        if col == 'TotalCharges' and not (isinstance(value, str) and value.strip()):
+            return None
+        return "missing" if value is None or value != value else "not_numeric"
+    if col in codes:
+        return None if 0 <= number < len(codes[col]) and number == int(number) else "unknown_category"
+    if col in NUMERIC_RANGES and not NUMERIC_RANGES[col][0] <= number <= NUMERIC_RANGES[col][1]:
+        return "out_of_range"
+    if col in INTEGER_COLUMNS and number != int(number):
+        return "not_integer"
+    return None
+
+def encode_record(row, features, codes, total_charges_fill=None):
+    """
+    Mã hóa một khách hàng (dict dữ liệu thô hoặc đã mã hóa) thành list số theo thứ tự `features`.
+    Dùng chung cho ChurnPreprocessor.encode_row, LinearScorer.score_row và ScoringSnapshot.encode.
+    Thiếu cột hoặc giá trị sai -> ValueError; TotalCharges trống -> total_charges_fill.
+    """
+    values = []
+    for col in features:
+        try:
+            value = row[col]
+        except KeyError:
+            raise ValueError(f"Thiếu cột '{col}'") from None
+        table = codes.get(col)
+        if table is not None and isinstance(value, str):
+            try:
+                values.append(table[value])
+            except KeyError:
+                raise ValueError(f"Giá trị không hợp lệ ở cột '{col}': ['{value}']") from None
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = math.nan
+        kind = value_error(col, value, number, codes)
+        if kind is not None:
+            raise ValueError(f"Giá trị không hợp lệ ở cột '{col}' ({kind}): [{value!r}]")
+        if number != number and total_charges_fill is not None:
+            number = total_charges_fill
+        values.append(number)
+    return values
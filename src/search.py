@@ -0,0 +1,268 @@
+"""
+Tìm siêu tham số cho từng họ mô hình bằng successive halving.
+
+Mỗi vòng (rung) đánh giá các ứng viên còn lại bằng AUC trung bình k-fold trên
+`resource` dòng train đầu tiên của mỗi fold, giữ lại 1/eta ứng viên tốt nhất và
+tăng resource lên eta lần cho tới khi dùng toàn bộ dữ liệu.
+
+- Ma trận của từng fold được tạo một lần, lưu .npy trong cache_dir và các tiến trình
+  con memory-map lại (không tính lại cho từng trial).
+- Trial chạy song song trên process pool (joblib), giới hạn bởi time_budget (giây): hạn được
+  kiểm tra sau mỗi trial; quá hạn thì không nhận thêm kết quả, các trial đang chạy bị hủy
+  và chỉ các trial đã xong được ghi log.
+- Mô hình gốc lấy từ get_models với số dòng của X, nên SVM dùng cùng mode (SVC hoặc
+  Nystroem + LinearSVC) với train_and_evaluate trên cùng dữ liệu; không gian tìm kiếm
+  của bản xấp xỉ dùng tên tham số của pipeline (APPROX_SVM_SPACE).
+- Mỗi trial xong được ghi vào log JSONL kèm digest của dữ liệu (X, y, cv, random_state);
+  chạy lại với cùng log_path sẽ bỏ qua các trial đã có trên cùng dữ liệu, nên có thể tiếp
+  tục sau khi bị ngắt. Bản ghi của dữ liệu khác (hoặc log cũ không có digest) bị bỏ qua.
+
+    from src.search import successive_halving
+    result = successive_halving(X_train, y_train, n_jobs=4, time_budget=600,
+                                log_path="../models/search_log.jsonl")
+    best_model, results = train_and_evaluate(X_train, y_train, X_test, y_test,
+                                             params=result["best_params"])
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import multiprocessing
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold, ParameterSampler
+
+try:
+    from src.modeling import get_models
+except ImportError:
+    from modeling import get_models
+
+# Không gian tìm kiếm cho từng họ mô hình (tên khớp với modeling.get_models)
+PARAM_SPACES = {
+    "Logistic Regression": {
+        "C": list(np.logspace(-3, 2, 11)),
+        "class_weight": [None, "balanced"],
+    },
+    "Decision Tree": {
+        "max_depth": [3, 4, 5, 6, 8, 10, 12, None],
+        "min_samples_leaf": [1, 5, 10, 20, 50, 100],
+        "criterion": ["gini", "entropy"],
+    },
+    "Random Forest": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [6, 8, 10, 12, None],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": ["sqrt", 0.5],
+    },
+    "SVM RBF": {
+        "C": list(np.logspace(-2, 2, 9)),
+        "gamma": ["scale", 0.01, 0.03, 0.1],
+    },
+}
+
+# SVM xấp xỉ (từ SVM_LARGE_DATA_THRESHOLD dòng): cùng C/gamma, tên tham số theo pipeline.
+# gamma=None là 1/n_features, tương đương gamma="scale" trên dữ liệu đã chuẩn hóa.
+APPROX_SVM_SPACE = {
+    "calibratedclassifiercv__estimator__C": list(np.logspace(-2, 2, 9)),
+    "nystroem__gamma": [None, 0.01, 0.03, 0.1],
+}
+
+def _params_key(family, params):
+    """Khóa ổn định cho một bộ tham số (dùng trong log)"""
+    return family + ":" + json.dumps(params, sort_keys=True, default=str)
+
+def _to_json(params):
+    """Chuyển kiểu NumPy trong params về kiểu Python để ghi JSON"""
+    return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in params.items()}
+
+def folds_digest(X, y, cv=3, random_state=42):
+    """Định danh của dữ liệu + cách chia fold (tên thư mục cache và khóa resume trong log)"""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    return hashlib.sha256(X.tobytes() + y.tobytes() + f"{cv}-{random_state}".encode()).hexdigest()[:16]
+
+def cache_folds(X, y, cache_dir, cv=3, random_state=42, digest=None):
+    """
+    Tạo và lưu ma trận train/validation của từng fold (một lần).
+    Dòng train của mỗi fold được xáo trộn sẵn để "resource dòng đầu tiên" là mẫu ngẫu nhiên.
+    Trả về danh sách đường dẫn (X_tr, y_tr, X_va, y_va) cho từng fold.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    digest = digest or folds_digest(X, y, cv, random_state)
+    root = os.path.join(cache_dir, f"folds-{digest}")
+
+    rng = np.random.default_rng(random_state)
+    skf = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    folds = []
+    for i, (tr, va) in enumerate(skf.split(X, y)):
+        tr = rng.permutation(tr)
+        paths = tuple(os.path.join(root, f"fold{i}_{name}.npy") for name in ("X_tr", "y_tr", "X_va", "y_va"))
+        if not all(os.path.exists(p) for p in paths):
+            os.makedirs(root, exist_ok=True)
+            for path, arr in zip(paths, (X[tr], y[tr], X[va], y[va])):
+                np.save(path, arr)
+        folds.append(paths)
+    return folds
+
+def _score(model, X, y):
+    if hasattr(model, "predict_proba"):
+        return roc_auc_score(y, model.predict_proba(X)[:, 1])
+    return roc_auc_score(y, model.decision_function(X))
+
+def _run_trial(family, estimator, params, resource, folds):
+    """AUC trung bình trên các fold khi huấn luyện với `resource` dòng đầu tiên"""
+    start = time.perf_counter()
+    aucs = []
+    for x_tr, y_tr, x_va, y_va in folds:
+        X_tr = np.load(x_tr, mmap_mode="r")
+        y_tr = np.load(y_tr, mmap_mode="r")
+        model = clone(estimator).set_params(**params)
+        model.fit(X_tr[:resource], y_tr[:resource])
+        aucs.append(_score(model, np.load(x_va, mmap_mode="r"), np.load(y_va, mmap_mode="r")))
+    return {"family": family, "params": _to_json(params), "resource": int(resource),
+            "auc": float(np.mean(aucs)), "auc_std": float(np.std(aucs)),
+            "seconds": time.perf_counter() - start}
+
+def _load_log(log_path, data):
+    """Các trial đã xong trong log trên cùng dữ liệu `data` (folds_digest)"""
+    done = {}
+    if log_path and os.path.exists(log_path):
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # Dòng cuối có thể bị ghi dở khi tiến trình bị ngắt
+                    continue
+                if rec.get("data") != data:
+                    continue
+                done[(_params_key(rec["family"], rec["params"]), rec["resource"])] = rec
+    return done
+
+def _base_estimator(family, n_rows, n_features):
+    """Mô hình gốc và không gian tìm kiếm của một họ (SVM: exact hoặc approx theo n_rows)"""
+    model = get_models(n_rows=n_rows, n_features=n_features)[family]
+    if hasattr(model, "steps"):
+        return model, APPROX_SVM_SPACE
+    # SVC: bỏ Platt scaling khi tìm kiếm, AUC tính từ decision_function
+    if "probability" in model.get_params():
+        model.set_params(probability=False)
+    return model, PARAM_SPACES[family]
+
+def _run_rung(family, estimator, todo, resource, folds, n_jobs, deadline):
+    """
+    Chạy các trial của một rung, sinh kết quả theo thứ tự hoàn thành.
+    Dừng khi quá deadline: trial đang chạy bị hủy (kết quả đến muộn bị bỏ).
+    """
+    if not todo:
+        return
+    timeout = max(deadline - time.perf_counter(), 1e-3) if deadline else None
+    results = Parallel(n_jobs=n_jobs, return_as="generator_unordered", timeout=timeout)(
+        delayed(_run_trial)(family, estimator, p, resource, folds) for p in todo
+    )
+    try:
+        for rec in results:
+            if deadline and time.perf_counter() > deadline:
+                return
+            yield rec
+    except (TimeoutError, multiprocessing.TimeoutError):
+        return
+    finally:
+        # Đóng generator: joblib hủy các trial chưa xong
+        results.close()
+
+def successive_halving(X, y, families=None, n_candidates=27, eta=3, min_resource=None,
+                       cv=3, n_jobs=1, time_budget=None, log_path=None, cache_dir=None,
+                       random_state=42, verbose=True):
+    """
+    Successive halving cho từng họ mô hình.
+    Trả về {"best_params": {họ: params}, "families": {họ: {"best_params", "best_auc", "rungs"}}}.
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget else None
+    families = families or list(PARAM_SPACES)
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "churn_search")
+    data = folds_digest(X, y, cv, random_state)
+    folds = cache_folds(X, y, cache_dir, cv=cv, random_state=random_state, digest=data)
+
+    n_train = len(np.load(folds[0][1], mmap_mode="r"))
+    n_rows, n_features = np.shape(X)
+    if min_resource is None:
+        min_resource = max(200, n_train // eta ** 3)
+
+    done = _load_log(log_path, data)
+    log_file = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    summary = {}
+    try:
+        for family in families:
+            # Cùng số dòng với train_and_evaluate(X_train=X) để SVM cùng mode exact/approx
+            estimator, space = _base_estimator(family, n_rows, n_features)
+            candidates = list(ParameterSampler(space, n_iter=n_candidates,
+                                               random_state=random_state))
+            # ParameterSampler có thể trả về bộ trùng khi lưới nhỏ
+            unique = {}
+            for params in candidates:
+                unique.setdefault(_params_key(family, _to_json(params)), params)
+            candidates = list(unique.values())
+
+            resource = min_resource
+            rungs = []
+            scored = []
+            while candidates:
+                if deadline and time.perf_counter() > deadline:
+                    if verbose:
+                        print(f"[{family}] hết thời gian, dừng ở resource={resource}")
+                    break
+                resource = min(resource, n_train)
+
+                todo = [p for p in candidates
+                        if (_params_key(family, _to_json(p)), resource) not in done]
+                for rec in _run_rung(family, estimator, todo, resource, folds, n_jobs, deadline):
+                    rec["data"] = data
+                    done[(_params_key(family, rec["params"]), resource)] = rec
+                    if log_file:
+                        log_file.write(json.dumps(rec) + "\n")
+                        log_file.flush()
+
+                finished = [done[key] for key in ((_params_key(family, _to_json(p)), resource)
+                                                  for p in candidates) if key in done]
+                if len(finished) < len(candidates):
+                    # Hết thời gian giữa rung: chỉ dùng rung dở khi chưa có rung nào hoàn thành
+                    if verbose:
+                        print(f"[{family}] hết thời gian ở resource={resource} "
+                              f"({len(finished)}/{len(candidates)} trial xong)")
+                    if not scored and finished:
+                        scored = sorted(finished, key=lambda r: -r["auc"])
+                    break
+                scored = sorted(finished, key=lambda r: -r["auc"])
+                rungs.append({"resource": resource, "n_candidates": len(candidates),
+                              "best_auc": scored[0]["auc"]})
+                if verbose:
+                    print(f"[{family}] resource={resource:<6} ứng viên={len(candidates):<3} "
+                          f"AUC tốt nhất={scored[0]['auc']:.4f}")
+
+                if resource >= n_train or len(candidates) == 1:
+                    break
+                keep = max(1, len(candidates) // eta)
+                keep_keys = {_params_key(family, r["params"]) for r in scored[:keep]}
+                candidates = [p for p in candidates if _params_key(family, _to_json(p)) in keep_keys]
+                resource *= eta
+
+            if scored:
+                summary[family] = {"best_params": scored[0]["params"], "best_auc": scored[0]["auc"],
+                                   "resource": scored[0]["resource"], "rungs": rungs}
+    finally:
+        if log_file:
+            log_file.close()
+
+    if verbose:
+        print(f"Hoàn thành sau {time.perf_counter() - start:.1f}s")
+    return {"best_params": {f: s["best_params"] for f, s in summary.items()}, "families": summary}
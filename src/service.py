@@ -0,0 +1,264 @@
+"""
+HTTP service dự đoán churn (chỉ dùng thư viện chuẩn asyncio).
+
+    python -m src.service --port 8000
+
+Endpoints:
+    POST /predict        {"gender": "Male", ...}            -> {"prediction", "probability"}
+    POST /predict/batch  {"rows": [{...}, {...}]}            -> {"predictions", "probabilities"}
+    GET  /health
+    GET  /stats          độ trễ p50/p99, throughput, kích thước micro-batch
+
+Các request đồng thời được gom thành micro-batch trong cửa sổ vài mili-giây
+để dùng chung một lần gọi preprocessor.transform + model.predict_proba.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+import pandas as pd
+
+try:
+    from src.predict import load_model, load_preprocessor, MODELS_DIR
+    from src.validation import validate_batch
+except ImportError:
+    from predict import load_model, load_preprocessor, MODELS_DIR
+    from validation import validate_batch
+
+class LatencyStats:
+    """Thống kê độ trễ (giữ tối đa `window` mẫu gần nhất) và throughput"""
+
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+
+    def record(self, latency, n_rows):
+        self.latencies.append(latency)
+        self.requests += 1
+        self.rows += n_rows
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        lat = np.fromiter(self.latencies, dtype=float) * 1000
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+            "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+            "requests_per_s": self.requests / elapsed if elapsed > 0 else 0.0,
+            "rows_per_s": self.rows / elapsed if elapsed > 0 else 0.0,
+            "mean_batch_rows": float(np.mean(self.batch_sizes)) if self.batch_sizes else None,
+        }
+
+class MicroBatcher:
+    """
+    Gom các request đến trong khoảng `max_wait_ms` (hoặc tới `max_batch_rows` dòng)
+    thành một lần gọi model. Mỗi request nhận lại đúng phần kết quả của mình.
+    """
+
+    def __init__(self, model, preprocessor, max_wait_ms=5.0, max_batch_rows=4096, stats=None):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_rows = max_batch_rows
+        self.stats = stats or LatencyStats()
+        self._queue = None
+        self._worker = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def predict(self, rows):
+        """Dự đoán cho danh sách dict dữ liệu thô; trả về (nhãn, xác suất) dạng list"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future))
+        return await future
+
+    def _score(self, rows):
+        # Dòng sai schema -> ValidationError (ValueError) -> HTTP 400 cho đúng request đó
+        df, _ = validate_batch(pd.DataFrame(rows))
+        X = self.preprocessor.transform(df)
+        proba = self.model.predict_proba(X)
+        labels = self.model.classes_[np.argmax(proba, axis=1)]
+        return labels.astype(int).tolist(), proba[:, 1].tolist()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            n_rows = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+
+            # Gom thêm request cho tới hết cửa sổ thời gian hoặc đủ số dòng
+            while n_rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                n_rows += len(item[0])
+
+            self.stats.batch_sizes.append(n_rows)
+            rows = [row for r, _ in items for row in r]
+            try:
+                labels, probs = await loop.run_in_executor(None, self._score, rows)
+            except Exception:
+                # Một request lỗi không được làm hỏng cả batch: chấm riêng từng request.
+                # Future có thể đã bị hủy (client ngắt kết nối) - không được làm chết worker.
+                for r, future in items:
+                    if future.done():
+                        continue
+                    try:
+                        result = await loop.run_in_executor(None, self._score, r)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                continue
+
+            start = 0
+            for r, future in items:
+                end = start + len(r)
+                if not future.done():
+                    future.set_result((labels[start:end], probs[start:end]))
+                start = end
+
+class ChurnService:
+    """Service HTTP tối giản trên asyncio.start_server"""
+
+    def __init__(self, model, preprocessor, max_wait_ms=5.0, max_batch_rows=4096):
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(model, preprocessor, max_wait_ms, max_batch_rows, self.stats)
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8000):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            return 200, self.stats.snapshot()
+        if method == "POST" and path in ("/predict", "/predict/batch"):
+            payload = json.loads(body or b"null")
+            single = path == "/predict"
+            rows = [payload] if single else (payload.get("rows") if isinstance(payload, dict) else payload)
+            if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+                return 400, {"error": "Dữ liệu phải là object JSON (hoặc {'rows': [...]})"}
+            if not rows:
+                return 200, {"predictions": [], "probabilities": []}
+
+            start = time.perf_counter()
+            labels, probs = await self.batcher.predict(rows)
+            self.stats.record(time.perf_counter() - start, len(rows))
+
+            if single:
+                return 200, {"prediction": labels[0], "probability": probs[0]}
+            return 200, {"predictions": labels, "probabilities": probs}
+        return 404, {"error": "Not found"}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self._route(method, path, body)
+                except (ValueError, KeyError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+def main(argv=None):
+    """CLI: python -m src.service --port 8000"""
+    parser = argparse.ArgumentParser(description="HTTP service dự đoán churn")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=os.path.join(MODELS_DIR, "model.pkl"))
+    parser.add_argument("--preprocessor", default=os.path.join(MODELS_DIR, "preprocessor.pkl"))
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="Cửa sổ gom micro-batch (mili-giây)")
+    parser.add_argument("--max-batch-rows", type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    # Load artifact đúng một lần lúc khởi động
+    model = load_model(args.model)
+    preprocessor = load_preprocessor(args.preprocessor)
+
+    async def serve():
+        service = ChurnService(model, preprocessor, args.max_wait_ms, args.max_batch_rows)
+        port = await service.start(args.host, args.port)
+        print(f"Service đang chạy tại http://{args.host}:{port}")
+        try:
+            await service.server.serve_forever()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Snapshot chấm điểm dựng sẵn: một file .npz chứa mọi thứ cần để dự đoán từ dữ liệu thô
+(bảng mã hóa, giá trị điền TotalCharges, thống kê chuẩn hóa và bộ chấm điểm đã làm phẳng).
+
+Load snapshot chỉ cần NumPy: không import pandas/sklearn, không unpickle model,
+nên phù hợp cho job chấm điểm ngắn và lần khởi động đầu tiên.
+    - Logistic Regression -> LinearScorer (scaler đã gộp vào hệ số)
+    - Random Forest / Decision Tree -> FlatForest (bảng node phẳng) + mean/scale của scaler
+
+    snapshot = ScoringSnapshot.from_model(model, preprocessor)   # lúc train (cần sklearn)
+    snapshot.save("../models/snapshot.npz")
+    snapshot = ScoringSnapshot.load("../models/snapshot.npz")    # lúc chấm điểm (chỉ NumPy)
+    snapshot.predict_single({"gender": "Male", ...})
+    snapshot.predict_rows(list_of_dicts)
+"""
+import json
+import numpy as np
+
+try:
+    from src.schema import FEATURE_COLUMNS, encode_record
+    from src.linear_scorer import LinearScorer, export_linear_scorer
+    from src.forest_scorer import FlatForest
+except ImportError:
+    from schema import FEATURE_COLUMNS, encode_record
+    from linear_scorer import LinearScorer, export_linear_scorer
+    from forest_scorer import FlatForest
+
+SNAPSHOT_VERSION = 1
+
+# Mảng của từng loại bộ chấm điểm được lưu trong snapshot (tiền tố "s_")
+_FOREST_ARRAYS = ("feature", "threshold", "left", "right", "leaf_proba", "roots")
+
+class ScoringSnapshot:
+    """Bộ mã hóa + bộ chấm điểm thuần NumPy, đọc/ghi bằng một file .npz"""
+
+    def __init__(self, scorer, categories, total_charges_fill, mean=None, scale=None,
+                 features=None):
+        self.scorer = scorer
+        self.categories = categories
+        self.total_charges_fill = float(total_charges_fill)
+        # LinearScorer làm việc trên dữ liệu đã mã hóa (chưa chuẩn hóa) nên không cần mean/scale
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self.features = list(features or FEATURE_COLUMNS)
+        self.codes = {col: {value: code for code, value in enumerate(levels)}
+                      for col, levels in categories.items()}
+
+    @property
+    def kind(self):
+        return "linear" if isinstance(self.scorer, LinearScorer) else "forest"
+
+    @classmethod
+    def from_model(cls, model, preprocessor):
+        """Dựng snapshot từ model sklearn đã fit và ChurnPreprocessor"""
+        categories = {col: list(levels) for col, levels in preprocessor.categories_.items()}
+        fill = preprocessor.total_charges_median_
+        if hasattr(model, "coef_"):
+            scorer = export_linear_scorer(model, preprocessor, features=FEATURE_COLUMNS)
+            return cls(scorer, categories, fill)
+        if hasattr(model, "tree_") or hasattr(model, "estimators_"):
+            scorer = FlatForest.from_sklearn(model, keep_model=False)
+            scaler = preprocessor.scaler_
+            return cls(scorer, categories, fill, mean=scaler.mean_, scale=scaler.scale_)
+        raise ValueError(f"Chưa hỗ trợ snapshot cho {type(model).__name__}")
+
+    def encode(self, rows):
+        """
+        dict hoặc list các dict (dữ liệu thô) -> ma trận đã mã hóa (n, n_features).
+        Cùng quy tắc kiểm tra với ChurnPreprocessor.encode_row: dữ liệu sai -> ValueError.
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+        X = np.empty((len(rows), len(self.features)))
+        for i, row in enumerate(rows):
+            X[i] = encode_record(row, self.features, self.codes, self.total_charges_fill)
+        return X
+
+    def predict_proba(self, X_encoded):
+        """Xác suất churn cho ma trận đã mã hóa (chưa chuẩn hóa)"""
+        if self.kind == "linear":
+            return self.scorer.score(X_encoded)[1]
+        return self.scorer.predict_churn_proba((np.asarray(X_encoded) - self.mean) / self.scale)
+
+    def predict_rows(self, rows):
+        """Dự đoán hàng loạt từ list các dict. Trả về {"prediction", "probability"} (mảng)."""
+        prob = self.predict_proba(self.encode(rows))
+        classes = self.scorer.classes
+        return {"prediction": classes[(prob > 0.5).astype(np.intp)].astype(int), "probability": prob}
+
+    def predict_single(self, row):
+        """Dự đoán 1 khách hàng, cùng dạng kết quả với predict.predict_single"""
+        result = self.predict_rows([row])
+        return {"prediction": int(result["prediction"][0]),
+                "probability": float(result["probability"][0])}
+
+    def save(self, filepath):
+        """Ghi snapshot ra một file .npz (không dùng pickle)"""
+        meta = {"version": SNAPSHOT_VERSION, "kind": self.kind, "features": self.features,
+                "categories": self.categories, "total_charges_fill": self.total_charges_fill}
+        arrays = {"meta": np.array(json.dumps(meta, ensure_ascii=False)),
+                  "s_classes": self.scorer.classes}
+        if self.kind == "linear":
+            arrays.update(s_weights=self.scorer.weights, s_bias=np.array(self.scorer.bias))
+        else:
+            arrays.update({f"s_{name}": getattr(self.scorer, name) for name in _FOREST_ARRAYS})
+            arrays.update(s_max_depth=np.array(self.scorer.max_depth), mean=self.mean, scale=self.scale)
+        np.savez(filepath, **arrays)
+
+    @classmethod
+    def load(cls, filepath):
+        """Đọc snapshot đã lưu bằng save()"""
+        with np.load(filepath, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"Phiên bản snapshot không hỗ trợ: {meta.get('version')}")
+            if meta["kind"] == "linear":
+                scorer = LinearScorer(data["s_weights"], float(data["s_bias"]), meta["features"],
+                                      classes=data["s_classes"])
+                return cls(scorer, meta["categories"], meta["total_charges_fill"],
+                           features=meta["features"])
+            scorer = FlatForest(*(data[f"s_{name}"] for name in _FOREST_ARRAYS),
+                                int(data["s_max_depth"]), data["s_classes"])
+            return cls(scorer, meta["categories"], meta["total_charges_fill"],
+                       mean=data["mean"], scale=data["scale"], features=meta["features"])
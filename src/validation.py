@@ -0,0 +1,202 @@
+"""
+Kiểm tra schema và dữ liệu cho cả lô trước khi chấm điểm (vectorized, mỗi cột một lần duyệt).
+
+    - Cột: thiếu cột (lỗi cả lô), cột thừa, thứ tự khác FEATURE_COLUMNS (chỉ báo cáo)
+    - Kiểu: cột số phải đọc được thành số, SeniorCitizen/tenure phải là số nguyên
+    - Miền giá trị biến phân loại (CATEGORY_LEVELS, hoặc mã 0..k-1 nếu đã mã hóa)
+    - Khoảng giá trị biến số (NUMERIC_RANGES)
+    - TotalCharges rỗng/không phải số: được điền median như lúc train nên không tính là lỗi
+      nếu là ô trống, nhưng số dòng bị ép kiểu (errors='coerce') luôn được đếm
+Các cột đã parse được trả về ở dạng float (cột số dạng chuỗi, NaN cho ô trống) hoặc category
+(biến phân loại hợp lệ), nên encode/transform ngay sau đó không phải parse lại: chi phí kiểm
+tra gần như được bù bởi phần encode tiết kiệm được.
+
+on_error:
+    "raise"      - ValidationError (kế thừa ValueError) nếu có dòng lỗi
+    "quarantine" - tách dòng lỗi ra report["quarantine"] (kèm cột _errors), trả về các dòng hợp lệ
+    "report"     - chỉ báo cáo, trả về nguyên lô
+
+    df_valid, report = validate_batch(chunk, on_error="quarantine")
+    print(format_report(report))
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from src.schema import (FEATURE_COLUMNS, CATEGORY_LEVELS, NUMERIC_RANGES, INTEGER_COLUMNS,
+                            ID_COLUMNS)
+except ImportError:
+    from schema import (FEATURE_COLUMNS, CATEGORY_LEVELS, NUMERIC_RANGES, INTEGER_COLUMNS,
+                        ID_COLUMNS)
+
+ON_ERROR_MODES = ("raise", "quarantine", "report")
+
+class ValidationError(ValueError):
+    """Dữ liệu đầu vào không qua được kiểm tra; report chứa chi tiết"""
+
+    def __init__(self, report):
+        super().__init__(format_report(report))
+        self.report = report
+
+    def __reduce__(self):
+        # Truyền được qua tiến trình worker (pipeline): dựng lại từ report, không từ message
+        return type(self), (self.report,)
+
+def _new_report(n_rows, columns):
+    present = [c for c in columns if c in FEATURE_COLUMNS]
+    return {
+        "rows": n_rows,
+        "invalid_rows": 0,
+        "missing_columns": [c for c in FEATURE_COLUMNS if c not in columns],
+        "extra_columns": [c for c in columns if c not in FEATURE_COLUMNS and c not in ID_COLUMNS],
+        "column_order_ok": present == FEATURE_COLUMNS,
+        "total_charges_coerced": 0,
+        "errors": {},        # {cột: {loại lỗi: số dòng}}
+        "examples": {},      # {cột: vài giá trị lỗi}
+        "invalid_positions": np.empty(0, dtype=np.intp),
+    }
+
+def _flag(report, bad, reasons, col, kind, mask, values, max_examples):
+    """Ghi nhận các dòng lỗi của một cột (mask: mảng bool)"""
+    count = int(mask.sum())
+    if not count:
+        return
+    report["errors"].setdefault(col, {})[kind] = count
+    examples = report["examples"].setdefault(col, [])
+    for v in pd.unique(values[mask])[:max_examples - len(examples)]:
+        examples.append(v.item() if isinstance(v, np.generic) else v)
+    bad |= mask
+    reasons[mask] = reasons[mask] + f"{col}:{kind};"
+
+def validate_batch(df, on_error="raise", categories=None, max_examples=3):
+    """
+    Kiểm tra một lô dữ liệu thô (DataFrame theo schema customer_churn.csv, hoặc đã mã hóa).
+    Trả về (DataFrame dùng để chấm điểm, report). Thiếu cột luôn raise ValidationError.
+    """
+    if on_error not in ON_ERROR_MODES:
+        raise ValueError(f"on_error không hợp lệ: {on_error}")
+    categories = categories or CATEGORY_LEVELS
+    n = len(df)
+    report = _new_report(n, list(df.columns))
+    if report["missing_columns"]:
+        raise ValidationError(report)
+
+    bad = np.zeros(n, dtype=bool)
+    reasons = np.full(n, "", dtype=object)
+    parsed = {}
+    for col in FEATURE_COLUMNS:
+        series = df[col]
+        values = series.to_numpy()
+
+        if col in categories:
+            levels = categories[col]
+            if pd.api.types.is_numeric_dtype(series):
+                # Đã mã hóa: mã hợp lệ là số nguyên 0..k-1
+                v = values.astype(np.float64)
+                missing = np.isnan(v)
+                with np.errstate(invalid="ignore"):
+                    unknown = (v < 0) | (v >= len(levels)) | (v != np.floor(v))
+                unknown &= ~missing
+            else:
+                # Một lần tra mã cho cả cột; chỉ phân biệt ô trống/giá trị lạ khi có mã -1
+                codes = pd.Categorical(series, categories=levels).codes
+                invalid = codes < 0
+                if not invalid.any():
+                    # Trả về dạng category để encode chỉ cần đọc lại mã, không hash chuỗi lần nữa
+                    parsed[col] = pd.Categorical.from_codes(codes, levels)
+                    continue
+                missing = invalid & series.isna().to_numpy()
+                unknown = invalid & ~missing
+            _flag(report, bad, reasons, col, "missing", missing, values, max_examples)
+            _flag(report, bad, reasons, col, "unknown_category", unknown, values, max_examples)
+            continue
+
+        if pd.api.types.is_numeric_dtype(series):
+            num = values.astype(np.float64, copy=False)
+            coerced = np.zeros(n, dtype=bool)
+        else:
+            num = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+            parsed[col] = num
+            coerced = np.isnan(num) & series.notna().to_numpy()
+        missing = np.isnan(num) & ~coerced
+        if col == "TotalCharges":
+            report["total_charges_coerced"] = int(coerced.sum())
+            # Ô trống (khách mới) được điền median như lúc train; chữ khác thì là lỗi
+            text = coerced.copy()
+            text[coerced] = series[coerced].astype(str).str.strip().to_numpy() != ""
+            _flag(report, bad, reasons, col, "not_numeric", text, values, max_examples)
+        else:
+            _flag(report, bad, reasons, col, "missing", missing, values, max_examples)
+            _flag(report, bad, reasons, col, "not_numeric", coerced, values, max_examples)
+
+        with np.errstate(invalid="ignore"):
+            if col in NUMERIC_RANGES:
+                lo, hi = NUMERIC_RANGES[col]
+                _flag(report, bad, reasons, col, "out_of_range", (num < lo) | (num > hi),
+                      values, max_examples)
+            if col in INTEGER_COLUMNS:
+                _flag(report, bad, reasons, col, "not_integer",
+                      ~np.isnan(num) & (num != np.floor(num)), values, max_examples)
+
+    # Cột đã parse ở trên (số dạng chuỗi, biến phân loại hợp lệ): trả về bản đã parse
+    # để bước encode không phải làm lại
+    if parsed:
+        df = df.assign(**parsed)
+    report["invalid_rows"] = int(bad.sum())
+    report["invalid_positions"] = np.flatnonzero(bad)
+    if not bad.any() or on_error == "report":
+        return df, report
+    if on_error == "raise":
+        raise ValidationError(report)
+
+    quarantine = df[bad].copy()
+    quarantine["_errors"] = reasons[bad]
+    report["quarantine"] = quarantine
+    return df[~bad], report
+
+def merge_reports(reports):
+    """Gộp report của nhiều lô (vd. các khối của predict_batch/score_csv)"""
+    merged = None
+    offset = 0
+    for r in reports:
+        if merged is None:
+            merged = {k: (dict(v) if isinstance(v, dict) else v) for k, v in r.items()}
+            merged["errors"] = {c: dict(e) for c, e in r["errors"].items()}
+            merged["examples"] = {c: list(e) for c, e in r["examples"].items()}
+            merged["quarantine"] = [r["quarantine"]] if "quarantine" in r else []
+        else:
+            for key in ("rows", "invalid_rows", "total_charges_coerced"):
+                merged[key] += r[key]
+            merged["column_order_ok"] = merged["column_order_ok"] and r["column_order_ok"]
+            merged["invalid_positions"] = np.concatenate([merged["invalid_positions"],
+                                                          r["invalid_positions"] + offset])
+            for col, kinds in r["errors"].items():
+                target = merged["errors"].setdefault(col, {})
+                for kind, count in kinds.items():
+                    target[kind] = target.get(kind, 0) + count
+            for col, values in r["examples"].items():
+                target = merged["examples"].setdefault(col, [])
+                target.extend(v for v in values if v not in target)
+            if "quarantine" in r:
+                merged["quarantine"].append(r["quarantine"])
+        offset += r["rows"]
+    if merged is None:
+        return None
+    merged["quarantine"] = pd.concat(merged["quarantine"]) if merged["quarantine"] else None
+    return merged
+
+def format_report(report):
+    """Tóm tắt một dòng: số dòng lỗi, lỗi theo cột, cột thiếu/thừa, số dòng TotalCharges bị ép kiểu"""
+    parts = [f"{report['invalid_rows']}/{report['rows']} dòng lỗi"]
+    if report["missing_columns"]:
+        parts.append(f"thiếu cột {report['missing_columns']}")
+    if report["extra_columns"]:
+        parts.append(f"cột thừa {report['extra_columns']}")
+    if not report["column_order_ok"]:
+        parts.append("thứ tự cột khác FEATURE_COLUMNS")
+    for col, kinds in report["errors"].items():
+        detail = ", ".join(f"{kind}={count}" for kind, count in kinds.items())
+        parts.append(f"{col}: {detail} (vd. {report['examples'].get(col, [])[:3]})")
+    if report["total_charges_coerced"]:
+        parts.append(f"TotalCharges ép kiểu (coerce) {report['total_charges_coerced']} dòng")
+    return "; ".join(parts)
@@ -0,0 +1,7 @@
+"""Cho phép `import src.*` khi chạy pytest từ bất kỳ thư mục nào."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,73 @@
+"""
+Giải thích dự đoán (src.predict.explain, score_csv --explain): đóng góp + base phải khớp
+đầu ra của model, dòng bị cách ly không có lý do.
+
+    python -m pytest -q tests/test_explain.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from src.predict import explain, explain_batch, score_csv, load_model, load_preprocessor, MODELS_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT, "data", "customer_churn.csv")
+PREPROCESSOR_PATH = os.path.join(MODELS_DIR, "preprocessor.pkl")
+SCALER_PATH = os.path.join(MODELS_DIR, "scaler.pkl")
+
+@pytest.fixture(scope="module")
+def scaled():
+    df = pd.read_csv(DATA_PATH, nrows=2000)
+    X = load_preprocessor(PREPROCESSOR_PATH).transform(df)
+    return X, (df["Churn"] == "Yes").astype(int).to_numpy()
+
+def test_linear_contributions_sum_to_log_odds(scaled):
+    X, y = scaled
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    contrib, base = explain(model, X)
+    assert contrib.shape == X.shape
+    np.testing.assert_allclose(contrib.sum(axis=1) + base, model.decision_function(X), atol=1e-10)
+
+@pytest.mark.parametrize("model", [
+    DecisionTreeClassifier(max_depth=6, random_state=0),
+    RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0),
+], ids=["tree", "forest"])
+def test_tree_contributions_sum_to_probability(scaled, model):
+    X, y = scaled
+    model.fit(X, y)
+    contrib, base = explain(model, X, block_size=300)
+    np.testing.assert_allclose(contrib.sum(axis=1) + base, model.predict_proba(X)[:, 1], atol=1e-10)
+
+def test_explain_batch_matches_explain():
+    model = load_model(os.path.join(MODELS_DIR, "model.pkl"))
+    df = pd.read_csv(DATA_PATH, nrows=50)
+    result = explain_batch(model, df, scaler_path=SCALER_PATH, chunk_size=20,
+                           preprocessor_path=PREPROCESSOR_PATH)
+    contrib, base = explain(model, load_preprocessor(PREPROCESSOR_PATH).transform(df))
+    assert result["base"] == base
+    np.testing.assert_allclose(result["contributions"], contrib)
+
+def test_score_csv_explain_leaves_quarantined_rows_blank(tmp_path):
+    df = pd.read_csv(DATA_PATH, nrows=30, dtype=str)
+    df.loc[[4, 17], "Contract"] = "Forever"
+    input_path, output_path = tmp_path / "in.csv", tmp_path / "out.csv"
+    df.to_csv(input_path, index=False)
+
+    model = load_model(os.path.join(MODELS_DIR, "model.pkl"))
+    n_rows = score_csv(model, str(input_path), str(output_path), SCALER_PATH, chunk_size=10,
+                       preprocessor_path=PREPROCESSOR_PATH, explain_top=3, on_error="quarantine")
+    assert n_rows == 30
+
+    out = pd.read_csv(output_path, keep_default_na=False)
+    bad = out.index.isin([4, 17])
+    reasons = out[["reason_1", "reason_2", "reason_3"]]
+    assert (reasons[bad] == "").all().all()
+    assert (reasons[~bad] != "").all().all()
+    assert (out.loc[bad, "prediction"] == -1).all()
+    assert (out.loc[bad, "contribution_1"] == "").all()
+    assert out.loc[~bad, "prediction"].isin([0, 1]).all()
@@ -0,0 +1,88 @@
+"""
+Checkpoint của src.pipeline: chạy bị ngắt giữa chừng rồi chạy lại phải cho đúng kết quả
+của một lần chạy liền mạch; đổi model thì không được dùng lại checkpoint cũ.
+
+    python -m pytest -q tests/test_pipeline.py
+"""
+import os
+import shutil
+
+import pytest
+
+from src import pipeline
+from src.predict import MODELS_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT, "data", "customer_churn.csv")
+CHUNK_SIZE = 1000
+
+class _Killed(Exception):
+    pass
+
+@pytest.fixture
+def models(tmp_path):
+    """Bản sao model/scaler/preprocessor (test được phép đổi mtime)"""
+    paths = {}
+    for name in ("model", "scaler", "preprocessor"):
+        paths[f"{name}_path"] = str(tmp_path / f"{name}.pkl")
+        shutil.copy(os.path.join(MODELS_DIR, f"{name}.pkl"), paths[f"{name}_path"])
+    return paths
+
+def _score(output_path, models):
+    return pipeline.score_file(DATA_PATH, output_path, chunk_size=CHUNK_SIZE, n_workers=2,
+                               executor="thread", **models)
+
+def _kill_after(monkeypatch, n_parts):
+    """Luồng ghi "chết" ngay sau khi ghi xong n_parts khối"""
+    write = pipeline._Writer._write
+
+    def _write(self, out):
+        if self.state["chunks_done"] >= n_parts:
+            raise _Killed()
+        write(self, out)
+    monkeypatch.setattr(pipeline._Writer, "_write", _write)
+
+def _count_writes(monkeypatch):
+    calls = []
+    write = pipeline._Writer._write
+
+    def _write(self, out):
+        calls.append(len(out))
+        write(self, out)
+    monkeypatch.setattr(pipeline._Writer, "_write", _write)
+    return calls
+
+def test_resume_after_kill_matches_uninterrupted_run(tmp_path, models, monkeypatch):
+    expected_path = str(tmp_path / "expected.csv")
+    n_rows = _score(expected_path, models)
+
+    output_path = str(tmp_path / "out.csv")
+    with monkeypatch.context() as m:
+        _kill_after(m, 3)
+        with pytest.raises(_Killed):
+            _score(output_path, models)
+    assert os.path.exists(output_path + ".ckpt.json")
+    # Tiến trình bị giết giữa lúc ghi khối thứ 4: phần ghi dở phải bị cắt khi chạy lại
+    with open(output_path, "a", encoding="utf-8") as f:
+        f.write("7590-VHVEG,1,0.5")
+
+    calls = _count_writes(monkeypatch)
+    assert _score(output_path, models) == n_rows
+    assert sum(calls) == n_rows - 3 * CHUNK_SIZE
+    assert not os.path.exists(output_path + ".ckpt.json")
+    with open(output_path, "rb") as got, open(expected_path, "rb") as expected:
+        assert got.read() == expected.read()
+
+def test_checkpoint_ignored_when_model_changes(tmp_path, models, monkeypatch):
+    output_path = str(tmp_path / "out.csv")
+    with monkeypatch.context() as m:
+        _kill_after(m, 2)
+        with pytest.raises(_Killed):
+            _score(output_path, models)
+
+    st = os.stat(models["model_path"])
+    os.utime(models["model_path"], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    calls = _count_writes(monkeypatch)
+    n_rows = _score(output_path, models)
+    # Chạy lại từ đầu: mọi khối được chấm điểm lại bằng model mới
+    assert sum(calls) == n_rows
@@ -0,0 +1,115 @@
+"""
+HTTP service (src.service) chạy thật trên cổng ngẫu nhiên với model/preprocessor trong models/.
+
+    python -m pytest -q tests/test_service.py
+"""
+import os
+import csv
+import json
+import asyncio
+
+from src.predict import load_model, load_preprocessor, predict_single, MODELS_DIR
+from src.service import ChurnService, MicroBatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(MODELS_DIR, "model.pkl")
+PREPROCESSOR_PATH = os.path.join(MODELS_DIR, "preprocessor.pkl")
+
+def _rows(n=3):
+    with open(os.path.join(ROOT, "data", "customer_churn.csv"), newline="") as f:
+        reader = csv.DictReader(f)
+        rows = [next(reader) for _ in range(n)]
+    for row in rows:
+        row.pop("customerID")
+        row.pop("Churn")
+    return rows
+
+async def _request(port, method, path, payload=None):
+    """Một request HTTP/1.1 (Connection: close), trả về (status, JSON)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, content = data.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), json.loads(content)
+
+def _service(max_wait_ms=5.0):
+    return ChurnService(load_model(MODEL_PATH), load_preprocessor(PREPROCESSOR_PATH),
+                        max_wait_ms=max_wait_ms)
+
+def test_predict_endpoints_and_stats():
+    rows = _rows()
+    expected = predict_single(load_model(MODEL_PATH), rows[0], preprocessor_path=PREPROCESSOR_PATH)
+
+    async def scenario():
+        service = _service()
+        port = await service.start(port=0)
+        try:
+            single = await _request(port, "POST", "/predict", rows[0])
+            batch = await _request(port, "POST", "/predict/batch", {"rows": rows})
+            empty = await _request(port, "POST", "/predict/batch", {"rows": []})
+            stats = await _request(port, "GET", "/stats")
+        finally:
+            await service.stop()
+        return single, batch, empty, stats
+
+    single, batch, empty, stats = asyncio.run(scenario())
+    assert single[0] == 200
+    assert single[1]["prediction"] == expected["prediction"]
+    assert abs(single[1]["probability"] - expected["probability"]) < 1e-12
+    assert batch[0] == 200 and len(batch[1]["probabilities"]) == len(rows)
+    assert abs(batch[1]["probabilities"][0] - expected["probability"]) < 1e-12
+    assert empty == (200, {"predictions": [], "probabilities": []})
+    assert stats[0] == 200 and stats[1]["requests"] >= 2
+
+def test_bad_row_in_concurrent_batch_only_fails_its_request():
+    good, other = _rows(2)
+    bad = dict(good, tenure="-5")
+
+    async def scenario():
+        # Cửa sổ gom đủ dài để các request đồng thời vào cùng một micro-batch
+        service = _service(max_wait_ms=50)
+        port = await service.start(port=0)
+        try:
+            results = await asyncio.gather(
+                _request(port, "POST", "/predict", good),
+                _request(port, "POST", "/predict", bad),
+                _request(port, "POST", "/predict", other),
+            )
+            health = await _request(port, "GET", "/health")
+            stats = await _request(port, "GET", "/stats")
+        finally:
+            await service.stop()
+        return results, health, stats
+
+    (ok1, err, ok2), health, stats = asyncio.run(scenario())
+    assert ok1[0] == 200 and ok2[0] == 200
+    assert err[0] == 400 and "tenure" in err[1]["error"]
+    assert health == (200, {"status": "ok"})
+    assert stats[0] == 200 and stats[1]["mean_batch_rows"] is not None
+
+def test_cancelled_request_does_not_stop_batcher():
+    good = _rows(1)[0]
+    bad = dict(good, Contract="Forever")
+
+    async def scenario():
+        batcher = MicroBatcher(load_model(MODEL_PATH), load_preprocessor(PREPROCESSOR_PATH),
+                               max_wait_ms=50)
+        batcher.start()
+        try:
+            cancelled = asyncio.create_task(batcher.predict([bad]))
+            pending = asyncio.create_task(batcher.predict([good]))
+            await asyncio.sleep(0.01)
+            # Client bỏ request lỗi trước khi batch được chấm (rơi vào nhánh chấm từng request)
+            cancelled.cancel()
+            first = await asyncio.wait_for(pending, 10)
+            later = await asyncio.wait_for(batcher.predict([good]), 10)
+        finally:
+            await batcher.stop()
+        return first, later
+
+    first, later = asyncio.run(scenario())
+    assert first == later
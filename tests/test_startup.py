@@ -0,0 +1,51 @@
+"""
+Ngân sách khởi động: import src.predict phải nhanh và không kéo theo pandas/sklearn
+(chi tiết từng bước xem benchmarks/bench_startup.py).
+
+    python -m pytest -q tests/test_startup.py
+    CHURN_IMPORT_BUDGET_MS=300 python -m pytest -q tests/test_startup.py
+"""
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.environ.get("CHURN_IMPORT_BUDGET_MS", 400))
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "joblib")
+
+# Chạy trong tiến trình mới (cold start); in JSON {"ms": ..., "heavy": [...]}
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{body}
+ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": ms, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _probe(body, repeat=3):
+    """Median thời gian (ms) của `body` qua nhiều tiến trình mới, cùng module nặng đã import"""
+    times, heavy = [], set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(body=body, heavy=HEAVY_MODULES)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(result["ms"])
+        heavy.update(result["heavy"])
+    return float(np.median(times)), sorted(heavy)
+
+def test_import_predict_within_budget():
+    ms, heavy = _probe("import src.predict")
+    assert not heavy, f"import src.predict kéo theo {heavy}"
+    assert ms <= BUDGET_MS, f"import src.predict mất {ms:.0f} ms > {BUDGET_MS:.0f} ms"
+
+def test_snapshot_scoring_needs_numpy_only():
+    body = (
+        "from src.predict import load_snapshot\n"
+        "import csv\n"
+        "row = next(csv.DictReader(open('data/customer_churn.csv', newline='')))\n"
+        "load_snapshot('models/snapshot.npz').predict_single(row)"
+    )
+    _, heavy = _probe(body, repeat=1)
+    assert not heavy, f"chấm điểm bằng snapshot kéo theo {heavy}"
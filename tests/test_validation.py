@@ -0,0 +1,84 @@
+"""
+Kiểm tra schema theo lô (src.validation.validate_batch, merge_reports).
+
+    python -m pytest -q tests/test_validation.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.validation import validate_batch, merge_reports, ValidationError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _batch(n=8):
+    """n dòng đầu của dữ liệu gốc, đọc dạng chuỗi như khi nhận từ CSV/JSON"""
+    return pd.read_csv(os.path.join(ROOT, "data", "customer_churn.csv"), nrows=n, dtype=str)
+
+def _bad_batch():
+    df = _batch()
+    df.loc[1, "Contract"] = "Forever"
+    df.loc[3, "MonthlyCharges"] = "-5"
+    df.loc[4, "tenure"] = "1.5"
+    df.loc[6, "TotalCharges"] = " "
+    return df
+
+def test_clean_batch_passes():
+    df, report = validate_batch(_batch())
+    assert report["invalid_rows"] == 0 and report["errors"] == {}
+    assert report["column_order_ok"] and report["extra_columns"] == []
+    assert len(df) == 8
+
+def test_errors_by_kind():
+    _, report = validate_batch(_bad_batch(), on_error="report")
+    assert report["errors"] == {"Contract": {"unknown_category": 1},
+                                "MonthlyCharges": {"out_of_range": 1},
+                                "tenure": {"not_integer": 1}}
+    assert report["examples"]["Contract"] == ["Forever"]
+    assert report["invalid_rows"] == 3
+    assert report["invalid_positions"].tolist() == [1, 3, 4]
+
+def test_blank_total_charges_is_counted_not_an_error():
+    df = _batch()
+    df.loc[2, "TotalCharges"] = " "
+    out, report = validate_batch(df)
+    assert report["invalid_rows"] == 0
+    assert report["total_charges_coerced"] == 1
+    assert np.isnan(out["TotalCharges"].iloc[2])
+
+    df.loc[5, "TotalCharges"] = "abc"
+    _, report = validate_batch(df, on_error="report")
+    assert report["errors"] == {"TotalCharges": {"not_numeric": 1}}
+    assert report["total_charges_coerced"] == 2
+
+def test_raise_mode():
+    with pytest.raises(ValidationError) as info:
+        validate_batch(_bad_batch())
+    assert info.value.report["invalid_rows"] == 3
+    with pytest.raises(ValidationError):
+        validate_batch(_batch().drop(columns=["tenure"]), on_error="report")
+
+def test_quarantine_matches_dropped_rows():
+    df = _bad_batch()
+    valid, report = validate_batch(df, on_error="quarantine")
+    quarantine = report["quarantine"]
+    dropped = df.index.difference(valid.index)
+    assert dropped.tolist() == quarantine.index.tolist() == report["invalid_positions"].tolist()
+    assert len(valid) + len(quarantine) == len(df)
+    assert quarantine["_errors"].tolist() == ["Contract:unknown_category;",
+                                              "MonthlyCharges:out_of_range;",
+                                              "tenure:not_integer;"]
+    assert (quarantine["customerID"] == df.loc[dropped, "customerID"]).all()
+
+def test_merge_reports_counts_and_offsets():
+    df = _bad_batch()
+    reports = [validate_batch(part, on_error="quarantine")[1] for part in (df.iloc[:4], df.iloc[4:])]
+    merged = merge_reports(reports)
+    whole = validate_batch(df, on_error="quarantine")[1]
+    for key in ("rows", "invalid_rows", "total_charges_coerced", "errors"):
+        assert merged[key] == whole[key]
+    assert merged["invalid_positions"].tolist() == whole["invalid_positions"].tolist()
+    assert merged["quarantine"].index.tolist() == whole["quarantine"].index.tolist()
+    assert merge_reports([]) is None